@@ -0,0 +1,233 @@
+"""
+Pluggable LM backends.
+
+Every entry point builds its LM through create_lm(), which reads an optional
+JSON config file (ATF_BACKEND_CONFIG, or atf_backend.json in the repository
+root), e.g.:
+
+    {"backend": "ollama", "model": "llama3.2:latest", "max_tokens": 2048}
+
+    {"backend": "openai_compatible", "model": "llama-3.2-3b",
+     "base_url": "http://localhost:8000/v1",
+     "max_batch_size": 8, "max_wait_ms": 10}
+
+The openai_compatible backend targets llama.cpp / vLLM style servers whose
+/completions endpoint accepts a list of prompts, and groups concurrent calls
+into micro-batches so several prompts share one request.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import dspy
+import requests
+from dsp.modules.lm import LM
+
+from atf.replay import lm_from_env
+
+DEFAULT_CONFIG = {
+    'backend': 'ollama',
+    'model': 'llama3.2:latest',
+    'max_tokens': 2048,
+}
+
+BACKENDS = {}
+
+# Optional config file picked up when no path is given
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'atf_backend.json')
+
+
+def register_backend(name):
+    """Register a factory that builds an LM from a config dict."""
+    def decorator(factory):
+        BACKENDS[name] = factory
+        return factory
+    return decorator
+
+
+def load_backend_config(path=None):
+    """
+    Merge the defaults with the JSON config file.
+
+    An explicitly requested file (the path argument or ATF_BACKEND_CONFIG) must
+    exist; the default atf_backend.json in the repository root is optional.
+    """
+    path = path or os.environ.get('ATF_BACKEND_CONFIG')
+    if path is None:
+        path = DEFAULT_CONFIG_PATH
+        if not os.path.exists(path):
+            return dict(DEFAULT_CONFIG)
+    elif not os.path.exists(path):
+        raise FileNotFoundError(f"LM backend config file not found: {path}")
+
+    config = dict(DEFAULT_CONFIG)
+    with open(path, 'r', encoding='utf-8') as f:
+        config.update(json.load(f))
+    return config
+
+
+def create_lm(config=None):
+    """Build the configured LM, honouring the record/replay environment variables."""
+    config = dict(config) if config is not None else load_backend_config()
+    name = config.pop('backend')
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LM backend '{name}'. Available: {', '.join(sorted(BACKENDS))}")
+    return lm_from_env(lambda: BACKENDS[name](**config))
+
+
+def generate_batch(lm, prompts, **kwargs):
+    """Complete several prompts, in one request if the LM supports batching."""
+    if hasattr(lm, 'batch_generate'):
+        return lm.batch_generate(prompts, **kwargs)
+    return [lm(prompt, **kwargs) for prompt in prompts]
+
+
+@register_backend('ollama')
+def ollama_backend(model, max_tokens=2048, model_type='text', **kwargs):
+    """Single-prompt Ollama backend (the default)."""
+    return dspy.OllamaLocal(model=model, model_type=model_type, max_tokens=max_tokens, **kwargs)
+
+
+@register_backend('openai_compatible')
+def openai_compatible_backend(model, **kwargs):
+    """Batched backend for llama.cpp / vLLM compatible completion servers."""
+    return BatchCompletionLM(model, **kwargs)
+
+
+class MicroBatcher:
+    """
+    Groups concurrent calls into micro-batches.
+
+    A batch is flushed when it reaches max_batch_size or when max_wait_s has
+    passed since its first call arrived. Calls with different kwargs are
+    never mixed in one batch. With timeout_s set, submit() raises
+    TimeoutError once its batch has been running for that many seconds; time
+    spent queued behind earlier batches does not count.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=8, max_wait_s=0.01, timeout_s=None):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_s
+        self.timeout_s = timeout_s
+        self.batches = 0
+        self.calls = 0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="atf-micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, prompt, **kwargs):
+        """Queue one prompt and block until its batch has been completed."""
+        future = Future()
+        dispatched = threading.Event()
+        self._queue.put((prompt, kwargs, future, dispatched))
+        try:
+            dispatched.wait()
+            return future.result(timeout=self.timeout_s)
+        except FutureTimeoutError:
+            raise TimeoutError(f"Batched completion took longer than {self.timeout_s}s.") from None
+        except BaseException:
+            # Interrupted while queued: cancelling keeps the prompt out of its batch
+            future.cancel()
+            raise
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            groups = {}
+            for prompt, kwargs, future, dispatched in self._collect():
+                key = json.dumps(kwargs, sort_keys=True, default=str)
+                groups.setdefault(key, (kwargs, []))[1].append((prompt, future, dispatched))
+
+            for kwargs, queued in groups.values():
+                # Drop prompts whose caller gave up while they were queued
+                items = [(prompt, future) for prompt, future, dispatched in queued
+                         if future.set_running_or_notify_cancel()]
+                for _, _, dispatched in queued:
+                    dispatched.set()
+                if not items:
+                    continue
+                self.batches += 1
+                self.calls += len(items)
+                try:
+                    results = self.batch_fn([prompt for prompt, _ in items], **kwargs)
+                    if len(results) != len(items):
+                        raise RuntimeError(f"Batch returned {len(results)} results for {len(items)} prompts.")
+                except Exception as e:
+                    for _, future in items:
+                        future.set_exception(e)
+                    continue
+                for (_, future), result in zip(items, results):
+                    future.set_result(result)
+
+
+class BatchCompletionLM(LM):
+    """
+    LM for OpenAI-compatible /completions servers that accept a list of
+    prompts per request (llama.cpp server, vLLM). Individual calls from
+    concurrent threads are coalesced by a MicroBatcher.
+    """
+
+    def __init__(self, model, base_url='http://localhost:8000/v1', max_tokens=2048, temperature=0.0,
+                 timeout_s=120, max_batch_size=8, max_wait_ms=10, **kwargs):
+        super().__init__(model)
+        self.provider = 'openai_compatible'
+        self.base_url = base_url.rstrip('/')
+        self.timeout_s = timeout_s
+        self.kwargs.update(max_tokens=max_tokens, temperature=temperature, **kwargs)
+        self.session = requests.Session()
+        self.batcher = MicroBatcher(self.batch_generate, max_batch_size=max_batch_size,
+                                    max_wait_s=max_wait_ms / 1000, timeout_s=timeout_s)
+
+    def batch_generate(self, prompts, **kwargs):
+        """Complete every prompt in a single request; returns one list of completions per prompt."""
+        response = self.basic_request(prompts, **kwargs)
+        return [[choice['text'] for choice in choices] for choices in self._split_choices(response, len(prompts))]
+
+    def _split_choices(self, response, count):
+        """Group a batched response's choices by the prompt they answer."""
+        n = response.get('_n', 1)
+        grouped = [[] for _ in range(count)]
+        for choice in sorted(response['choices'], key=lambda c: c.get('index', 0)):
+            grouped[choice.get('index', 0) // n].append(choice)
+        return grouped
+
+    def basic_request(self, prompt, **kwargs):
+        kwargs = {**self.kwargs, **kwargs}
+        payload = {k: v for k, v in kwargs.items() if k not in ('frequency_penalty', 'presence_penalty')}
+        payload['prompt'] = prompt
+        response = self.session.post(f"{self.base_url}/completions", json=payload, timeout=self.timeout_s)
+        response.raise_for_status()
+        response_json = response.json()
+        response_json['_n'] = kwargs.get('n', 1)
+
+        if isinstance(prompt, list):
+            # One history entry per prompt, as if each had been sent on its own
+            for single, choices in zip(prompt, self._split_choices(response_json, len(prompt))):
+                entry = {**response_json, 'choices': choices}
+                self.history.append({'prompt': single, 'response': entry, 'kwargs': kwargs, 'raw_kwargs': kwargs})
+        else:
+            self.history.append({'prompt': prompt, 'response': response_json, 'kwargs': kwargs, 'raw_kwargs': kwargs})
+        return response_json
+
+    def _get_choice_text(self, choice):
+        return choice['text']
+
+    def __call__(self, prompt, only_completed=True, return_sorted=False, **kwargs):
+        return self.batcher.submit(prompt, **kwargs)
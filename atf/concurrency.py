@@ -0,0 +1,20 @@
+"""Helpers for running DSPy programs from worker threads."""
+
+import dspy
+
+
+def bind_settings(fn):
+    """
+    Wrap fn so it runs with the calling thread's DSPy settings in any thread.
+
+    DSPy keeps settings per thread id and seeds unseen threads from the main
+    thread, but thread ids are recycled, so a pooled worker can otherwise pick
+    up a stale LM configured for an earlier thread with the same id.
+    """
+    config = dict(dspy.settings.config)
+
+    def bound(*args, **kwargs):
+        with dspy.settings.context(inherit_config=False, **config):
+            return fn(*args, **kwargs)
+
+    return bound
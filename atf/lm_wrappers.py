@@ -0,0 +1,29 @@
+"""Base class for LMs that wrap another LM to observe its calls."""
+
+from dsp.modules.lm import LM
+
+
+class WrappedLM(LM):
+    """
+    Delegates to a wrapped LM and shares its provider, kwargs and history, so
+    DSPy treats the wrapper exactly like the LM it wraps. Subclasses override
+    __call__ to add behaviour around self.lm(...).
+    """
+
+    default_model = 'wrapped'
+
+    def __init__(self, lm):
+        super().__init__(lm.kwargs.get('model', getattr(lm, 'model_name', self.default_model)))
+        self.lm = lm
+        self.provider = lm.provider
+        self.kwargs = lm.kwargs
+        self.history = lm.history
+
+    def basic_request(self, prompt, **kwargs):
+        return self.lm.basic_request(prompt, **kwargs)
+
+    def _get_choice_text(self, choice):
+        return self.lm._get_choice_text(choice)
+
+    def __call__(self, prompt, only_completed=True, return_sorted=False, **kwargs):
+        return self.lm(prompt, only_completed=only_completed, return_sorted=return_sorted, **kwargs)
@@ -1,6 +1,19 @@
 import dspy
+import json
 import os
 
+from atf.registry import registry
+from atf.scoring import PRINCIPLES
+from atf.backends import create_lm
+
+DOCS_DIR = os.path.join(os.path.dirname(__file__), '..', 'docs')
+
+# Gold-standard examples used to compile and evaluate the clarifier
+TRAIN_SET_PATH = os.path.join(DOCS_DIR, 'clarifier_train.jsonl')
+
+# Few-shot demos written by main() after compilation; used by default when present
+COMPILED_DEMOS_PATH = os.path.join(DOCS_DIR, 'clarifier_demos.jsonl')
+
 class TaskClarificationSignature(dspy.Signature):
     """
     You are a senior AI engineering assistant. Generate exactly 4 clear, concise clarifying questions - one for each principle: Objective, Scope, Deliverable, and Success Criteria. 
@@ -20,23 +33,55 @@ class TaskClarificationSignature(dspy.Signature):
 
 class ClarifierModule(dspy.Module):
     """A DSPy module for clarifying user tasks."""
-    def __init__(self, principles_path=None):
+    def __init__(self, principles_path=None, demos_path=None):
         super().__init__()
         self.clarifier = dspy.ChainOfThought(TaskClarificationSignature)
         
-        # Load principles once during initialization
-        if principles_path:
-            self.framework_principles = load_principles(principles_path)
-        else:
+        # Principles and demos live in the process-wide registry, so every
+        # instance shares one copy and picks up edits to the files.
+        if principles_path is None:
             # Default path relative to this file
-            default_path = os.path.join(os.path.dirname(__file__), '..', 'docs', 'framework_principles.md')
-            self.framework_principles = load_principles(default_path)
+            principles_path = os.path.join(DOCS_DIR, 'framework_principles.md')
+        if demos_path is None and os.path.exists(COMPILED_DEMOS_PATH):
+            demos_path = COMPILED_DEMOS_PATH
+        self.principles_path = principles_path
+        self.demos_path = demos_path
+        self._principles_override = None
+        
+        # Warm the shared registry entry so the first request doesn't pay for the load
+        registry.principles(self.principles_path)
+
+    @property
+    def framework_principles(self):
+        """The framework principles text, shared through the registry unless overridden."""
+        if self._principles_override is not None:
+            return self._principles_override
+        return registry.principles(self.principles_path)
+
+    @framework_principles.setter
+    def framework_principles(self, value):
+        self._principles_override = value
 
     def forward(self, user_request):
         """Forward method compatible with DSPy bootstrapping expectations."""
+        # Demos compiled into this module's predictor take precedence over the file
+        if self.demos_path and not self.clarifier.demos:
+            return self.clarifier(user_request=user_request, framework_principles=self.framework_principles,
+                                  demos=registry.demos(self.demos_path))
         result = self.clarifier(user_request=user_request, framework_principles=self.framework_principles)
         return result
 
+def save_demos(compiled_clarifier, path):
+    """Write a compiled clarifier's few-shot demos to a JSONL file the registry can serve."""
+    fields = ('user_request', 'rationale', 'clarifying_questions')
+    rows = [{k: demo[k] for k in fields if k in demo} for demo in compiled_clarifier.clarifier.demos]
+    # Replace the file atomically, as the registry's memory map expects
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+
 def load_principles(file_path: str) -> str:
     """Loads the framework principles from a file."""
     try:
@@ -49,50 +94,29 @@ def load_principles(file_path: str) -> str:
 def main():
     """Main function to run the Agent Task Framework clarifier."""
     # --- Configuration ---
-    # Using a local model via Ollama
+    # Using a local model via Ollama by default.
     # Make sure your Ollama server is running.
-    # To use a different model, change 'llama3' to the model name you have installed.
-    # To use a different provider (e.g., OpenAI), change the dspy.OllamaLocal line.
-    ollama_model = dspy.OllamaLocal(model='llama3.2:latest', model_type='text', max_tokens=2048)
-    dspy.settings.configure(lm=ollama_model)
+    # To use a different model or backend, point ATF_BACKEND_CONFIG at a JSON
+    # config file (see atf/backends.py).
+    # Set ATF_RECORD / ATF_REPLAY to record or replay LM traffic (see atf/replay.py).
+    lm = create_lm()
+    dspy.settings.configure(lm=lm)
 
     # --- Initialize and run the Clarifier ---
     # The ClarifierModule will automatically load the framework principles
-    principles_path = os.path.join(os.path.dirname(__file__), '..', 'docs', 'framework_principles.md')
+    principles_path = os.path.join(DOCS_DIR, 'framework_principles.md')
     clarifier = ClarifierModule(principles_path)
+    # Compile from scratch rather than from previously saved demos
+    clarifier.demos_path = None
     
     if not clarifier.framework_principles:
         print("Could not proceed without framework principles.")
         return
 
-    # --- Create Training Set ---
-    # We will create a few examples of ambiguous requests and the "gold standard"
-    # clarifying questions we would want the module to produce.
-    train_set = [
-        dspy.Example(
-            user_request="Hey, can you refactor the database stuff? It's too slow.",
-            clarifying_questions="""1. **Objective:** What is the primary performance metric we are trying to improve (e.g., query latency, throughput, reduced server load)? Are there specific slow queries you have identified?
-2. **Scope:** Which parts of the application or specific database tables are in scope for this refactoring? Should I avoid touching any specific areas?
-3. **Deliverable:** What is the expected outcome? Are you looking for a code pull request with the changes, a report on the findings, or both?
-4. **Success Criteria:** How will we know the refactoring was successful? Is there a specific performance benchmark we need to meet (e.g., "all API calls using the database must be under 100ms")?"""
-        ).with_inputs("user_request"),
-
-        dspy.Example(
-            user_request="The user page is broken.",
-            clarifying_questions="""1. **Objective:** What specific behavior makes you say the page is "broken"? Are you seeing an error message, is data not loading, or is there a visual glitch?
-2. **Scope:** Does this happen for all users or a specific user? Is it happening in all web browsers or just a particular one?
-3. **Deliverable:** What is the expected deliverable? A bug fix committed to the repository, or an analysis of the root cause?
-4. **Success Criteria:** How can I verify the fix? What specific steps should I take on the user page to confirm that the issue is resolved?"""
-        ).with_inputs("user_request"),
-
-        dspy.Example(
-            user_request="Add a new button for exporting data.",
-            clarifying_questions="""1. **Objective:** What specific data should be exported when the user clicks this button? What format should the export be in (e.g., CSV, JSON, PDF)?
-2. **Scope:** Where on the page should this button be located? Are there any specific UI mockups or design guidelines I should follow?
-3. **Deliverable:** What is the final deliverable? A pull request with the new button implemented and functional.
-4. **Success Criteria:** How do I confirm the button works correctly? Should I verify the contents and format of the exported file?"""
-        ).with_inputs("user_request"),
-    ]
+    # --- Load Training Set ---
+    # Examples of ambiguous requests and the "gold standard" clarifying
+    # questions we would want the module to produce, shared through the registry.
+    train_set = list(registry.corpus(TRAIN_SET_PATH))
 
     # --- Define Validation Logic ---
     # We need a way to score the outputs of our module. We will create a simple
@@ -116,12 +140,11 @@ def main():
             predicted_questions = str(pred)
         
         # Simple heuristic validation: check if the output contains questions about our 4 principles
-        principles = ['objective', 'scope', 'deliverable', 'success']
         questions_lower = predicted_questions.lower()
         
         # Count how many principles are addressed
         addressed_principles = 0
-        for principle in principles:
+        for principle in PRINCIPLES:
             if principle in questions_lower:
                 addressed_principles += 1
         
@@ -155,6 +178,18 @@ def main():
     compiled_clarifier = optimizer.compile(clarifier, trainset=train_set, valset=dev_set)
     
     print("✅ Compilation complete!\n")
+    
+    # Every ClarifierModule created from now on picks up the compiled demos
+    save_demos(compiled_clarifier, COMPILED_DEMOS_PATH)
+    print(f"💾 Saved compiled demos to {COMPILED_DEMOS_PATH}\n")
+
+    # --- Evaluate the compiled module on the dev set ---
+    # Examples are scored concurrently; with a batching backend (see
+    # atf/backends.py) the concurrent LM calls are grouped into micro-batches.
+    from dspy.evaluate import Evaluate
+    evaluator = Evaluate(devset=dev_set, metric=validate_clarification, num_threads=4, display_progress=False)
+    score = evaluator(compiled_clarifier)
+    print(f"Dev set score: {score}\n")
 
     # --- Example Usage ---
     # An example of an ambiguous user request
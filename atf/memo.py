@@ -0,0 +1,66 @@
+"""Session-scoped memoization of pipeline stage outputs."""
+
+import hashlib
+import json
+import threading
+
+
+def normalize_request(text: str) -> str:
+    """Collapse whitespace so trivially different requests share a memo entry."""
+    return " ".join(text.split())
+
+
+def fingerprint(inputs: dict) -> str:
+    """Stable hash of a stage's inputs."""
+    payload = json.dumps(inputs, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class StageMemo:
+    """
+    Memo of stage outputs for one session.
+
+    Each entry is keyed by the stage name and a fingerprint of only the inputs
+    that stage depends on, so a stage is recomputed exactly when one of its
+    own inputs changes and reused otherwise. A disabled memo always computes.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, stage, inputs, compute):
+        """Return the memoized output for (stage, inputs), computing it on a miss."""
+        if not self.enabled:
+            return compute()
+
+        key = (stage, fingerprint(inputs))
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+        return value
+
+    def invalidate(self, stage=None):
+        """Drop every entry, or only those belonging to one stage."""
+        with self._lock:
+            if stage is None:
+                self._entries.clear()
+            else:
+                self._entries = {k: v for k, v in self._entries.items() if k[0] != stage}
+
+    def stats(self):
+        """Return hit/miss counters and the number of stored entries."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,166 @@
+"""
+Opt-in profiling of the request path.
+
+Enable with ATF_PROFILE=<dir> (or `final_instructor.py --profile <dir>`).
+Each request writes:
+
+    <dir>/<request-id>.trace.json   Chrome trace events, one span per stage and
+                                    per LM call (open in Perfetto, chrome://tracing
+                                    or speedscope)
+    <dir>/<request-id>.prof         cProfile stats for the Python side
+                                    (snakeviz, flameprof, `python -m pstats`)
+
+Every span records wall and thread CPU time, and the trace summary separates
+time spent waiting on the LM from Python overhead (template rendering,
+parsing, printing).
+"""
+
+import cProfile
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import dspy
+
+from atf.lm_wrappers import WrappedLM
+
+
+class ProfiledLM(WrappedLM):
+    """Wraps an LM so each call is recorded as an 'lm' span."""
+
+    default_model = 'profiled'
+
+    def __init__(self, lm, profiler):
+        super().__init__(lm)
+        self.profiler = profiler
+
+    def __call__(self, prompt, only_completed=True, return_sorted=False, **kwargs):
+        with self.profiler.span('lm', category='lm', prompt_chars=len(prompt)):
+            return self.lm(prompt, only_completed=only_completed, return_sorted=return_sorted, **kwargs)
+
+
+class _Trace:
+    """Spans collected for one request."""
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.events = []
+        self.origin = time.perf_counter()
+
+
+class Profiler:
+    """Collects per-request stage/LM spans and cProfile stats and writes them to disk."""
+
+    def __init__(self, output_dir, use_cprofile=True):
+        self.output_dir = output_dir
+        self.use_cprofile = use_cprofile
+        self._local = threading.local()
+        self._seq = itertools.count(1)
+        os.makedirs(output_dir, exist_ok=True)
+
+    @property
+    def _trace(self):
+        return getattr(self._local, 'trace', None)
+
+    @contextmanager
+    def request(self, label='request'):
+        """Profile one request; nested calls in the same thread join the outer trace."""
+        if self._trace is not None:
+            with self.span(label, category='request'):
+                yield
+            return
+
+        request_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._seq):04d}"
+        self._local.trace = _Trace(request_id)
+        profile = cProfile.Profile() if self.use_cprofile else None
+        lm = dspy.settings.lm
+        lm_context = dspy.settings.context(lm=ProfiledLM(lm, self)) if lm is not None else nullcontext()
+
+        try:
+            with lm_context:
+                if profile:
+                    try:
+                        profile.enable()
+                    except ValueError:
+                        # Another profiler is already active (e.g. a concurrent request)
+                        profile = None
+                try:
+                    with self.span(label, category='request'):
+                        yield
+                finally:
+                    if profile:
+                        profile.disable()
+        finally:
+            trace = self._trace
+            self._local.trace = None
+            self._write(trace, profile)
+
+    @contextmanager
+    def span(self, name, category='stage', **args):
+        """Record a span with wall and thread CPU time on the current request's trace."""
+        trace = self._trace
+        if trace is None:
+            yield
+            return
+
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+            trace.events.append({
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': round((wall_start - trace.origin) * 1e6, 1),
+                'dur': round(wall * 1e6, 1),
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'args': {'cpu_ms': round(cpu * 1000, 3), **args},
+            })
+
+    def summarize(self, trace):
+        """Split request wall time into LM wait and Python overhead."""
+        request_us = max((e['dur'] for e in trace.events if e['cat'] == 'request'), default=0)
+        lm_us = sum(e['dur'] for e in trace.events if e['cat'] == 'lm')
+        wall_ms = round(request_us / 1000, 3)
+        lm_wait_ms = round(lm_us / 1000, 3)
+        return {
+            'request_id': trace.request_id,
+            'wall_ms': wall_ms,
+            'lm_wait_ms': lm_wait_ms,
+            # Derived from the rounded figures so the summary adds up exactly
+            'python_ms': round(wall_ms - lm_wait_ms, 3),
+            'lm_calls': sum(1 for e in trace.events if e['cat'] == 'lm'),
+            'stages': {e['name']: round(e['dur'] / 1000, 3) for e in trace.events if e['cat'] == 'stage'},
+        }
+
+    def _write(self, trace, profile):
+        base = os.path.join(self.output_dir, trace.request_id)
+        with open(base + '.trace.json', 'w', encoding='utf-8') as f:
+            json.dump({
+                'traceEvents': sorted(trace.events, key=lambda e: e['ts']),
+                'displayTimeUnit': 'ms',
+                'otherData': self.summarize(trace),
+            }, f)
+        if profile:
+            profile.dump_stats(base + '.prof')
+
+
+def profiler_from_env():
+    """A Profiler writing to $ATF_PROFILE, or None when profiling is off."""
+    output_dir = os.environ.get('ATF_PROFILE')
+    return Profiler(output_dir) if output_dir else None
+
+
+def span(profiler, name, **args):
+    """profiler.span(...) or a no-op context when profiling is off."""
+    return profiler.span(name, **args) if profiler else nullcontext()
+
+
+def profile_request(profiler, label='request'):
+    """profiler.request(...) or a no-op context when profiling is off."""
+    return profiler.request(label) if profiler else nullcontext()
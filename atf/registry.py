@@ -0,0 +1,175 @@
+"""Process-wide, read-only registry of principles, demos and training corpora."""
+
+import json
+import mmap
+import os
+import sys
+import threading
+import time
+from array import array
+
+import dspy
+
+
+def file_signature(path):
+    """(mtime_ns, size) of a file, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class Corpus:
+    """
+    Read-only JSONL corpus backed by a memory map.
+
+    Only the line offsets are held in memory; each record is parsed into a
+    dspy.Example on access, so a large corpus costs the same whether one or
+    a hundred instructors share it. Replace corpus files atomically (write,
+    then rename) rather than truncating them in place.
+    """
+
+    def __init__(self, path, input_keys=()):
+        self.path = path
+        self.input_keys = tuple(input_keys)
+        self._offsets = array('Q')
+
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+        start = 0
+        while start < size:
+            end = self._data.find(b'\n', start)
+            if end == -1:
+                end = size
+            if self._data[start:end].strip():
+                self._offsets.append(start)
+                self._offsets.append(end)
+            start = end + 1
+
+    def __len__(self):
+        return len(self._offsets) // 2
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("corpus index out of range")
+        start, end = self._offsets[2 * index], self._offsets[2 * index + 1]
+        example = dspy.Example(**json.loads(self._data[start:end]))
+        return example.with_inputs(*self.input_keys) if self.input_keys else example
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class _Entry:
+    """One registered file: its loaded value plus change-detection state."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.state = None  # (value, file signature), swapped atomically on reload
+        self.checked_at = 0.0
+        self.reloading = False
+
+
+class Registry:
+    """
+    Loads each principles file, demo set and training corpus once per process
+    and hands the same immutable object to every caller.
+
+    Files are re-checked at most every check_interval seconds. When a file has
+    changed it is reloaded in a background thread while callers keep getting
+    the previous version, so a reload never blocks a request. A file that is
+    deleted, renamed away or emptied keeps serving its previous version.
+    """
+
+    def __init__(self, check_interval=1.0, background_reload=True):
+        self.check_interval = check_interval
+        self.background_reload = background_reload
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def principles(self, path):
+        """Framework principles text ("" if the file is missing)."""
+        from atf.main import load_principles
+        return self._get('principles', path, load_principles)
+
+    def demos(self, path):
+        """Few-shot demos from a JSONL file, as a tuple of dspy.Example."""
+        return self._get('demos', path, lambda p: tuple(Corpus(p)))
+
+    def corpus(self, path, input_keys=('user_request',)):
+        """A training/evaluation set as a lazily parsed, mmap-backed Corpus."""
+        return self._get(('corpus', tuple(input_keys)), path, lambda p: Corpus(p, input_keys))
+
+    def _get(self, kind, path, loader):
+        path = os.path.abspath(path)
+        key = (kind, path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+
+        if entry.state is None:
+            # First load blocks, but only once per file across all threads
+            with entry.lock:
+                if entry.state is None:
+                    self._load(entry, path, loader)
+                    entry.checked_at = time.monotonic()
+            return entry.state[0]
+
+        now = time.monotonic()
+        if now - entry.checked_at >= self.check_interval:
+            entry.checked_at = now
+            if file_signature(path) != entry.state[1]:
+                self._schedule_reload(entry, path, loader)
+        return entry.state[0]
+
+    def _load(self, entry, path, loader):
+        signature = file_signature(path)
+        entry.state = (loader(path), signature)
+        self.loads += 1
+
+    def _reload(self, entry, path, loader):
+        signature = file_signature(path)
+        value = loader(path) if signature is not None else None
+        if not value:
+            # Remember the new signature so a missing or empty file isn't retried on every check
+            entry.state = (entry.state[0], signature)
+            sys.stderr.write(f"'{path}' is missing or empty; keeping the previously loaded version.\n")
+            return
+        entry.state = (value, signature)
+        self.loads += 1
+
+    def _schedule_reload(self, entry, path, loader):
+        with entry.lock:
+            if entry.reloading:
+                return
+            entry.reloading = True
+
+        def reload():
+            try:
+                self._reload(entry, path, loader)
+            except Exception as e:
+                sys.stderr.write(f"Error reloading '{path}': {e}\n")
+            finally:
+                entry.reloading = False
+
+        if self.background_reload:
+            threading.Thread(target=reload, name="atf-registry-reload", daemon=True).start()
+        else:
+            reload()
+
+    def clear(self):
+        """Forget every loaded file; the next access loads it again."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by every ClarifierModule / FinalInstructor in the process
+registry = Registry()
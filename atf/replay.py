@@ -0,0 +1,139 @@
+"""Record LM traffic to an on-disk trace and replay it without a model server."""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+from dsp.modules.lm import LM
+
+from atf.lm_wrappers import WrappedLM
+
+
+def request_key(prompt, kwargs):
+    """Stable key identifying one LM request by its prompt and call kwargs."""
+    payload = json.dumps({'prompt': prompt, 'kwargs': kwargs}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _open_trace(path, mode):
+    """Open a trace file, transparently gzip-compressed when it ends in .gz."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def load_trace(path):
+    """Load every record from a JSONL trace file."""
+    with _open_trace(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class RecordingLM(WrappedLM):
+    """
+    Wraps a real LM and appends every request/response with its timing to a
+    JSONL trace file (gzip-compressed if the path ends in .gz).
+
+    Each record is written and closed on its own, so a compressed trace is a
+    sequence of complete gzip members and stays readable even if the process
+    exits without calling close().
+    """
+
+    default_model = 'recorded'
+
+    def __init__(self, lm, trace_path):
+        super().__init__(lm)
+        self.trace_path = trace_path
+        self._lock = threading.Lock()
+
+        trace_dir = os.path.dirname(trace_path)
+        if trace_dir:
+            os.makedirs(trace_dir, exist_ok=True)
+        _open_trace(trace_path, 'a').close()
+
+    def __call__(self, prompt, only_completed=True, return_sorted=False, **kwargs):
+        start = time.perf_counter()
+        completions = self.lm(prompt, only_completed=only_completed, return_sorted=return_sorted, **kwargs)
+        elapsed = time.perf_counter() - start
+
+        record = {
+            'key': request_key(prompt, kwargs),
+            'prompt': prompt,
+            'kwargs': kwargs,
+            'completions': completions,
+            'elapsed_s': round(elapsed, 6),
+        }
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock, _open_trace(self.trace_path, 'a') as f:
+            f.write(line)
+
+        return completions
+
+    def close(self):
+        """Kept for API compatibility; every record is already flushed and closed."""
+
+
+class ReplayLM(LM):
+    """
+    Serves completions from a recorded trace instead of a model server.
+
+    Requests are matched by prompt and kwargs; repeated identical requests are
+    answered in recorded order, and the last answer is reused once exhausted.
+    With realtime=True each response is delayed by its recorded latency,
+    otherwise responses are returned as fast as possible.
+    """
+
+    def __init__(self, trace_path, realtime=False, max_tokens=2048):
+        super().__init__('replay')
+        self.provider = 'replay'
+        self.kwargs['max_tokens'] = max_tokens
+        self.trace_path = trace_path
+        self.realtime = realtime
+        self._lock = threading.Lock()
+        self._responses = defaultdict(deque)
+
+        for record in load_trace(trace_path):
+            self._responses[record['key']].append(record)
+
+    def _next_record(self, prompt, kwargs):
+        key = request_key(prompt, kwargs)
+        with self._lock:
+            queue = self._responses.get(key)
+            if not queue:
+                raise LookupError(f"No recorded response for this prompt in '{self.trace_path}'.")
+            return queue.popleft() if len(queue) > 1 else queue[0]
+
+    def basic_request(self, prompt, **kwargs):
+        record = self._next_record(prompt, kwargs)
+        if self.realtime:
+            time.sleep(record['elapsed_s'])
+
+        response = {'choices': [{'text': text} for text in record['completions']]}
+        self.history.append({'prompt': prompt, 'response': response, 'kwargs': kwargs, 'raw_kwargs': kwargs})
+        return response
+
+    def __call__(self, prompt, only_completed=True, return_sorted=False, **kwargs):
+        response = self.basic_request(prompt, **kwargs)
+        return [choice['text'] for choice in response['choices']]
+
+
+def lm_from_env(make_lm):
+    """
+    Build the LM, honouring the record/replay environment variables.
+
+    ATF_REPLAY=<trace>      serve responses from a recorded trace (no server needed)
+    ATF_REPLAY_REALTIME=1   replay with the recorded latencies
+    ATF_RECORD=<trace>      record every request/response made through make_lm()
+    """
+    replay_path = os.environ.get('ATF_REPLAY')
+    if replay_path:
+        return ReplayLM(replay_path, realtime=os.environ.get('ATF_REPLAY_REALTIME') == '1')
+
+    lm = make_lm()
+    record_path = os.environ.get('ATF_RECORD')
+    if record_path:
+        return RecordingLM(lm, record_path)
+    return lm
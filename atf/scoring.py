@@ -0,0 +1,118 @@
+"""Cheap, local scoring of how well a request covers the framework principles."""
+
+import re
+
+# The four framework principles, in the order questions are asked
+PRINCIPLES = ['objective', 'scope', 'deliverable', 'success']
+
+# A concrete file or directory: name.ext, dir/ or a path with several components
+PATH = (r'(?:\b[\w\-]+(?:/[\w\-.*]+)*\.(?:py|js|ts|tsx|jsx|java|go|rs|rb|md|json|ya?ml|toml|sql|html|css|txt|csv)\b'
+        r'|(?<![\w/])/?[\w\-.]+/(?:[\w\-.*]+/)+[\w\-.*]*'
+        r'|(?<![\w/])[\w\-.]+/(?=\s|$|[.,;)]))')
+
+ACTION = (r'\b(add|fix|make|change|support|handle|clean|refactor|optimi[sz]e|create|implement|improve|update|'
+          r'remove|analy[sz]e|document|migrate|write|build|test|investigate|replace|rename|convert)\w*\b')
+
+# Answer-shaped phrases that show a request already answers each principle.
+# Bare keywords ("output", "verify") are not enough: "The output is wrong" says
+# nothing about the deliverable.
+PRINCIPLE_PATTERNS = {
+    'objective': [
+        r'^\s*(objective|goal|task)\s*[:=]\s*\S.*',
+        ACTION + r'.*' + PATH,
+    ],
+    'scope': [
+        r'^\s*(scope|files?|directory|directories|in scope)\s*[:=]\s*\S.*',
+        PATH,
+    ],
+    'deliverable': [
+        r'^\s*(output|deliverable|result)\s*[:=]\s*\S.*',
+        r'\b(output|deliverable)\s+(should|will|must)\s+be\s+\S.*',
+        r'\b(create|produce|return|generate|write|modify)\b.*' + PATH,
+        r'\bpull request\b',
+    ],
+    'success': [
+        r'^\s*(success|success criteria|criteria|done when|acceptance criteria)\s*[:=]\s*\S.*',
+        r'\bsuccess\s+(is|means|=)\s*\S.*',
+        r'\d+\s*%',
+        r'\b(at least|under|below|within)\s+\d+',
+        r'\b(all )?(tests?|build|checks?)\s+(must |should )?(pass|passes|succeed)',
+    ],
+}
+
+# Clauses where the user doesn't know the answer count for nothing
+UNCERTAIN = re.compile(
+    r"\b((don't|do not|doesn't) (know|care)|not sure|unsure|no idea|unknown|whatever|tbd|n/a)\b",
+    re.IGNORECASE,
+)
+
+# Negatively phrased clauses ("Don't touch anything outside src/auth/") only
+# count as scope: a path they name still bounds the work, but they answer
+# nothing about the objective, deliverable or success criteria
+NEGATION = re.compile(r"\b(don't|do not|doesn't|never|not needed|no need)\b|^\s*no\b", re.IGNORECASE)
+
+_COMPILED = {
+    principle: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    for principle, patterns in PRINCIPLE_PATTERNS.items()
+}
+
+
+def clauses(request: str):
+    """Split a request (including its [Refinement N] answers) into clauses."""
+    text = re.sub(r'\[Refinement \d+\]:', '\n', request)
+    parts = re.split(r'\n+|(?<=[.!?;])\s+', text)
+    return [part.strip() for part in parts if part.strip()]
+
+
+class PrincipleCoverage:
+    """Which of the four principles a request already answers, and the phrases that answer them."""
+
+    def __init__(self, evidence):
+        self.evidence = evidence
+        self.covered = {p: bool(evidence[p]) for p in PRINCIPLES}
+
+    @property
+    def missing(self):
+        return [p for p in PRINCIPLES if not self.covered[p]]
+
+    @property
+    def is_complete(self):
+        return not self.missing
+
+    @property
+    def score(self):
+        return sum(self.covered.values()) / len(PRINCIPLES)
+
+    def __repr__(self):
+        return f"PrincipleCoverage(covered={[p for p in PRINCIPLES if self.covered[p]]}, missing={self.missing})"
+
+
+def score_principles(request: str) -> PrincipleCoverage:
+    """Score a (possibly refined) request against each framework principle, without the LM."""
+    evidence = {principle: [] for principle in PRINCIPLES}
+    for clause in clauses(request):
+        if UNCERTAIN.search(clause):
+            continue
+        principles = ['scope'] if NEGATION.search(clause) else PRINCIPLES
+        for principle in principles:
+            for pattern in _COMPILED[principle]:
+                match = pattern.search(clause)
+                if match:
+                    evidence[principle].append(" ".join(match.group(0).lower().split()).rstrip('.,;:!?'))
+    return PrincipleCoverage({p: sorted(set(found)) for p, found in evidence.items()})
+
+
+def focus_questions(clarifying_questions: str, missing) -> str:
+    """
+    Keep only the clarifying questions for still-missing principles.
+
+    Relies on the **OBJECTIVE:** / **SCOPE:** ... headers the clarifier is asked
+    to produce; if none are found the questions are returned unchanged.
+    """
+    sections = re.split(r'(?=\*\*(?:OBJECTIVE|SCOPE|DELIVERABLE|SUCCESS)[^*]*:\*\*)', clarifying_questions, flags=re.IGNORECASE)
+    headed = [s for s in sections if s.startswith('**')]
+    if not headed:
+        return clarifying_questions
+
+    kept = [s.strip() for s in headed if any(s[2:].lower().startswith(p) for p in missing)]
+    return "\n".join(kept) if kept else clarifying_questions
@@ -0,0 +1,79 @@
+"""Single-flight coalescing of concurrent identical computations."""
+
+import threading
+from collections import Counter
+
+
+class _Call:
+    """One in-flight computation and the callers waiting on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time.
+
+    The first caller for a key runs the computation; callers arriving with the
+    same key while it is in flight wait and receive its result (or exception).
+    Nothing is kept once the computation finishes - combine with StageMemo for
+    caching. A disabled SingleFlight runs every call.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = Counter()
+        self.coalesced = Counter()
+
+    def do(self, key, compute, kind=None):
+        """Return compute(), sharing one execution among concurrent callers with the same key."""
+        kind = kind or 'call'
+        if not self.enabled:
+            with self._lock:
+                self.executed[kind] += 1
+            return compute()
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed[kind] += 1
+            else:
+                self.coalesced[kind] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = compute()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def is_in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def stats(self):
+        """Executed and coalesced call counts, per kind and in total."""
+        with self._lock:
+            kinds = sorted(set(self.executed) | set(self.coalesced))
+            return {
+                'executed': sum(self.executed.values()),
+                'coalesced': sum(self.coalesced.values()),
+                'by_kind': {k: {'executed': self.executed[k], 'coalesced': self.coalesced[k]} for k in kinds},
+            }
@@ -0,0 +1,281 @@
+"""
+Pluggable output sinks.
+
+FinalInstructor.process_request() never prints; it reports progress and
+results to a sink. Sinks that touch the console or disk hand their writes to
+a background AsyncWriter, which batches them off the request path.
+
+Sinks can be selected with a spec string (ATF_OUTPUT or --output), several
+separated by commas:
+
+    quiet                 discard everything (the library default)
+    console               print progress and results as they happen
+    buffered              print each request's output in one batched write
+    jsonl:<path>          append one JSON record per result
+    markdown:<dir>        write one Markdown file per result, never overwriting
+"""
+
+import itertools
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+
+
+def render_result(result):
+    """Format a result the way the interactive tool presents it."""
+    lines = []
+    if result.get('clarifying_questions'):
+        lines += [
+            "\n" + "=" * 60,
+            "📋 OPTION 1: CLARIFYING QUESTIONS",
+            "=" * 60,
+            "Use these if you want to refine your request further:\n",
+            result['clarifying_questions'],
+        ]
+
+    if result.get('final_instruction'):
+        lines += [
+            "\n" + "=" * 60,
+            "🚀 OPTION 2: READY-TO-USE INSTRUCTION",
+            "=" * 60,
+            "Copy this directly to your background agent:\n",
+            result['final_instruction'],
+            "=" * 60,
+        ]
+    else:
+        lines += [
+            "\n" + "=" * 60,
+            "🚀 OPTION 2: NOT AVAILABLE",
+            "=" * 60,
+            "Request is too vague to create actionable instructions.",
+            "Please use the clarifying questions above to add more details.",
+            "=" * 60,
+        ]
+    return "\n".join(lines)
+
+
+def render_markdown(user_request, result):
+    """Markdown export of a request and its result (the format used when saving to a file)."""
+    text = "# Background Agent Task\n\n"
+    text += f"## Original Request\n{user_request}\n\n"
+    text += f"## Clarifying Questions\n{result.get('clarifying_questions') or 'Not generated.'}\n\n"
+    if result.get('final_instruction'):
+        text += f"## Ready-to-Use Instruction\n{result['final_instruction']}\n"
+    else:
+        text += "## Ready-to-Use Instruction\nNot available - request too vague.\n"
+    return text
+
+
+_sequence = itertools.count(1)
+
+
+def unique_path(directory, stem, suffix):
+    """A path in directory that no request has used yet (stem, timestamp, pid and sequence number)."""
+    slug = re.sub(r'[^a-z0-9_]+', '-', stem.lower()).strip('-')[:40] or 'request'
+    while True:
+        name = f"{slug}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_sequence):04d}{suffix}"
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            return path
+
+
+class AsyncWriter:
+    """
+    Runs write jobs on a background thread, handing them over in batches.
+
+    write_batch receives a list of queued items; it is called once per batch
+    of up to max_batch items, so many small writes become a few large ones.
+    """
+
+    def __init__(self, write_batch, max_batch=64):
+        self.write_batch = write_batch
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="atf-sink-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, item):
+        self._queue.put(item)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                sys.stderr.write(f"❌ Error writing output: {e}\n")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued item has been written."""
+        self._queue.join()
+
+
+class Sink:
+    """Base sink; discards everything."""
+
+    def status(self, message):
+        """A progress message for the request being processed in this thread."""
+
+    def result(self, user_request, result):
+        """A completed request (result is None if processing failed)."""
+
+    def flush(self):
+        """Block until all pending output has been written."""
+
+    def close(self):
+        self.flush()
+
+
+class QuietSink(Sink):
+    """Discards all output."""
+
+
+class ConsoleSink(Sink):
+    """
+    Prints progress and results.
+
+    With buffered=True, each request's messages are collected per thread and
+    written together with its result in a single background write, so
+    concurrent requests don't interleave and never block on the terminal.
+    """
+
+    def __init__(self, buffered=False, stream=None):
+        self.buffered = buffered
+        self.stream = stream or sys.stdout
+        self._local = threading.local()
+        self._writer = AsyncWriter(self._write_batch) if buffered else None
+
+    def _buffer(self):
+        if not hasattr(self._local, 'lines'):
+            self._local.lines = []
+        return self._local.lines
+
+    def _write_batch(self, chunks):
+        self.stream.write("".join(chunks))
+        self.stream.flush()
+
+    def status(self, message):
+        if self.buffered:
+            self._buffer().append(message)
+        else:
+            print(message, file=self.stream)
+
+    def result(self, user_request, result):
+        text = render_result(result) if result else ""
+        if self.buffered:
+            lines = self._buffer() + ([text] if text else [])
+            self._local.lines = []
+            self._writer.put("\n".join(lines) + "\n")
+        elif text:
+            print(text, file=self.stream)
+
+    def flush(self):
+        if self._writer:
+            self._writer.flush()
+
+
+class JsonlSink(Sink):
+    """Appends one JSON record per result to a JSONL file, batching writes."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._writer = AsyncWriter(self._write_batch)
+
+    def _write_batch(self, records):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+
+    def result(self, user_request, result):
+        self._writer.put({
+            'timestamp': time.time(),
+            'user_request': user_request,
+            'ok': result is not None,
+            **(result or {}),
+        })
+
+    def flush(self):
+        self._writer.flush()
+
+
+class MarkdownDirSink(Sink):
+    """Writes one Markdown file per result into a directory, with unique filenames."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._writer = AsyncWriter(self._write_batch)
+
+    def _write_batch(self, files):
+        for path, text in files:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+
+    def result(self, user_request, result):
+        if result is None:
+            return
+        path = unique_path(self.directory, " ".join(user_request.split()[:6]), '.md')
+        self._writer.put((path, render_markdown(user_request, result)))
+
+    def flush(self):
+        self._writer.flush()
+
+
+class MultiSink(Sink):
+    """Fans output out to several sinks."""
+
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+
+    def status(self, message):
+        for sink in self.sinks:
+            sink.status(message)
+
+    def result(self, user_request, result):
+        for sink in self.sinks:
+            sink.result(user_request, result)
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+
+def sink_from_spec(spec):
+    """Build a sink from a spec such as 'buffered,jsonl:out/results.jsonl'."""
+    sinks = []
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        kind, _, arg = part.partition(':')
+        if kind == 'quiet':
+            sinks.append(QuietSink())
+        elif kind == 'console':
+            sinks.append(ConsoleSink())
+        elif kind == 'buffered':
+            sinks.append(ConsoleSink(buffered=True))
+        elif kind == 'jsonl' and arg:
+            sinks.append(JsonlSink(arg))
+        elif kind == 'markdown' and arg:
+            sinks.append(MarkdownDirSink(arg))
+        else:
+            raise ValueError(f"Unknown output sink '{part}'.")
+    if not sinks:
+        return QuietSink()
+    return sinks[0] if len(sinks) == 1 else MultiSink(sinks)
+
+
+def sink_from_env(default='quiet'):
+    """The sink described by $ATF_OUTPUT, or the default spec."""
+    return sink_from_spec(os.environ.get('ATF_OUTPUT') or default)
@@ -4,43 +4,96 @@ Example scenarios using the Agent Task Framework.
 
 This file demonstrates how to use the Agent Task Framework with various
 real-world scenarios that could apply to any software project.
+
+The scenario suite runs concurrently against one shared, initialized
+FinalInstructor and prints a per-scenario timing table, so it doubles as a
+smoke-load test of a deployment (see --parallel and --repeat).
 """
 
+import argparse
+import math
 import sys
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 sys.path.append('..')
 
 from final_instructor import FinalInstructor
+from atf.concurrency import bind_settings
+from atf.memo import StageMemo
+from atf.singleflight import SingleFlight
+from atf.sinks import sink_from_spec
+
+SCENARIOS = [
+    {
+        'name': 'vague_request',
+        'title': '📊 Scenario 1: Vague Data Processing Request',
+        'note': 'This request is too vague. Let\'s see how the framework handles it...',
+        'request': "Improve the data processing pipeline",
+    },
+    {
+        'name': 'specific_request',
+        'title': '🗄️  Scenario 2: Specific Database Optimization Request',
+        'note': 'This request has enough details. Let\'s see the framework\'s response...',
+        'request': """Optimize the database queries in src/database/connection.py:
+1. Add connection pooling
+2. Implement query caching
+3. Add performance monitoring
+4. Output: Modified connection.py with optimizations
+5. Success: 30% faster query execution time""",
+    },
+    {
+        'name': 'api_development',
+        'title': '📚 Scenario 3: API Documentation Request',
+        'note': 'This request is well-defined. Let\'s see the framework\'s response...',
+        'request': """Create comprehensive API documentation for the user management endpoints:
+- Focus on /api/users/* endpoints
+- Include authentication examples
+- Add error response documentation
+- Output: Markdown files in docs/api/ directory
+- Success: All endpoints documented with examples""",
+    },
+    {
+        'name': 'testing_improvement',
+        'title': '🧪 Scenario 4: Test Coverage Improvement',
+        'note': 'This request is specific and actionable...',
+        'request': """Improve test coverage for the authentication module:
+- Focus on src/auth/ directory
+- Add unit tests for edge cases
+- Include integration tests
+- Output: New test files in tests/auth/
+- Success: 90% coverage for auth module""",
+    },
+]
 
 def setup_dspy():
     """Configure DSPy for the examples."""
     try:
         import dspy
-        ollama_model = dspy.OllamaLocal(model='llama3.2:latest', model_type='text', max_tokens=2048)
-        dspy.settings.configure(lm=ollama_model)
+        from atf.backends import create_lm
+        dspy.settings.configure(lm=create_lm())
         return True
     except Exception as e:
         print(f"❌ Error setting up DSPy: {e}")
         return False
 
-def scenario_1_vague_request():
-    """
-    Scenario: User wants to improve a data processing pipeline but doesn't specify details.
-    """
-    print("📊 Scenario 1: Vague Data Processing Request")
+def run_scenario(instructor, scenario):
+    """Run one scenario against a shared instructor and time it."""
+    start = time.perf_counter()
+    result = instructor.process_request(scenario['request'])
+    return {
+        'scenario': scenario,
+        'result': result,
+        'elapsed': time.perf_counter() - start,
+    }
+
+def print_scenario(run):
+    """Print the framework's response for one completed scenario."""
+    scenario, result = run['scenario'], run['result']
+    print(scenario['title'])
     print("=" * 50)
-    
-    original_request = "Improve the data processing pipeline"
-    
-    print(f"Original Request: {original_request}")
-    print("\nThis request is too vague. Let's see how the framework handles it...")
-    
-    instructor = FinalInstructor()
-    if not instructor.initialize():
-        print("❌ Failed to initialize instructor")
-        return
-    
-    result = instructor.process_request(original_request)
+    print(f"Request: {scenario['request']}")
+    print(f"\n{scenario['note']}")
     
     if result:
         print("\n✅ Framework Response:")
@@ -53,145 +106,86 @@ def scenario_1_vague_request():
             print(result['final_instruction'])
         else:
             print("\nNo direct instruction available - request too vague")
+    else:
+        print("\n❌ Failed to process scenario")
     
     print("\n" + "=" * 50 + "\n")
 
-def scenario_2_specific_request():
-    """
-    Scenario: User provides a more specific request about optimizing a database.
-    """
-    print("🗄️  Scenario 2: Specific Database Optimization Request")
-    print("=" * 50)
-    
-    specific_request = """Optimize the database queries in src/database/connection.py:
-1. Add connection pooling
-2. Implement query caching
-3. Add performance monitoring
-4. Output: Modified connection.py with optimizations
-5. Success: 30% faster query execution time"""
-    
-    print(f"Specific Request: {specific_request}")
-    print("\nThis request has enough details. Let's see the framework's response...")
-    
-    instructor = FinalInstructor()
-    if not instructor.initialize():
-        print("❌ Failed to initialize instructor")
-        return
-    
-    result = instructor.process_request(specific_request)
-    
-    if result:
-        print("\n✅ Framework Response:")
-        print("=" * 30)
-        print("Clarifying Questions Generated:")
-        print(result['clarifying_questions'])
-        
-        if result['final_instruction']:
-            print("\nDirect Instruction Available:")
-            print(result['final_instruction'])
-        else:
-            print("\nNo direct instruction available")
-    
-    print("\n" + "=" * 50 + "\n")
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
 
-def scenario_3_api_development():
-    """
-    Scenario: User wants to create API documentation.
-    """
-    print("📚 Scenario 3: API Documentation Request")
-    print("=" * 50)
+def print_timing_table(runs, wall_time, parallelism):
+    """Print per-scenario timings and overall throughput."""
+    print("⏱️  Scenario Timings")
+    print("-" * 60)
+    print(f"{'Scenario':<24}{'Runs':>6}{'Errors':>8}{'Mean (s)':>11}{'Max (s)':>11}")
+    for scenario in SCENARIOS:
+        scenario_runs = [r for r in runs if r['scenario'] is scenario]
+        if not scenario_runs:
+            continue
+        times = [r['elapsed'] for r in scenario_runs]
+        errors = sum(1 for r in scenario_runs if r['result'] is None)
+        print(f"{scenario['name']:<24}{len(times):>6}{errors:>8}{sum(times) / len(times):>11.2f}{max(times):>11.2f}")
+    print("-" * 60)
     
-    api_request = """Create comprehensive API documentation for the user management endpoints:
-- Focus on /api/users/* endpoints
-- Include authentication examples
-- Add error response documentation
-- Output: Markdown files in docs/api/ directory
-- Success: All endpoints documented with examples"""
-    
-    print(f"API Request: {api_request}")
-    print("\nThis request is well-defined. Let's see the framework's response...")
-    
-    instructor = FinalInstructor()
-    if not instructor.initialize():
-        print("❌ Failed to initialize instructor")
-        return
-    
-    result = instructor.process_request(api_request)
-    
-    if result:
-        print("\n✅ Framework Response:")
-        print("=" * 30)
-        print("Clarifying Questions Generated:")
-        print(result['clarifying_questions'])
-        
-        if result['final_instruction']:
-            print("\nDirect Instruction Available:")
-            print(result['final_instruction'])
-        else:
-            print("\nNo direct instruction available")
-    
-    print("\n" + "=" * 50 + "\n")
+    times = [r['elapsed'] for r in runs]
+    errors = sum(1 for r in runs if r['result'] is None)
+    print(f"Requests: {len(runs)}  Errors: {errors}  Parallelism: {parallelism}")
+    print(f"Wall time: {wall_time:.2f}s  Throughput: {len(runs) / wall_time:.2f} req/s")
+    print(f"Latency p50: {percentile(times, 50):.2f}s  p95: {percentile(times, 95):.2f}s")
 
-def scenario_4_testing_improvement():
+def run_all_scenarios(parallelism=4, repeat=1, show_results=True, instructor=None, output=None):
     """
-    Scenario: User wants to improve test coverage.
-    """
-    print("🧪 Scenario 4: Test Coverage Improvement")
-    print("=" * 50)
-    
-    test_request = """Improve test coverage for the authentication module:
-- Focus on src/auth/ directory
-- Add unit tests for edge cases
-- Include integration tests
-- Output: New test files in tests/auth/
-- Success: 90% coverage for auth module"""
+    Run every scenario concurrently against one shared instructor.
     
-    print(f"Test Request: {test_request}")
-    print("\nThis request is specific and actionable...")
-    
-    instructor = FinalInstructor()
-    if not instructor.initialize():
-        print("❌ Failed to initialize instructor")
-        return
-    
-    result = instructor.process_request(test_request)
-    
-    if result:
-        print("\n✅ Framework Response:")
-        print("=" * 30)
-        print("Clarifying Questions Generated:")
-        print(result['clarifying_questions'])
-        
-        if result['final_instruction']:
-            print("Direct Instruction Available:")
-            print(result['final_instruction'])
-        else:
-            print("\nNo direct instruction available")
-    
-    print("\n" + "=" * 50 + "\n")
-
-def run_all_scenarios():
-    """Run all example scenarios."""
+    Each scenario is submitted `repeat` times, with at most `parallelism`
+    requests in flight. Memoization and request coalescing are disabled for
+    the run so every run reaches the LM; a caller-supplied instructor gets its
+    memo and in-flight tracker back afterwards.
+    `output` is an optional sink spec (e.g. 'jsonl:results.jsonl', see
+    atf/sinks.py) that every result is also exported to. Returns the list of
+    timed runs.
+    """
     print("🎯 Agent Task Framework - Example Scenarios")
     print("=" * 60)
     print("Demonstrating how the framework handles different types of requests.")
     print()
     
-    if not setup_dspy():
-        print("❌ Failed to setup DSPy. Make sure Ollama is running.")
-        return
+    if instructor is None:
+        instructor = FinalInstructor(sink=sink_from_spec(output) if output else None)
+        if not instructor.initialize():
+            print("❌ Failed to initialize instructor. Make sure Ollama is running.")
+            return []
+    
+    saved = instructor.memo, instructor.inflight
+    instructor.memo = StageMemo(enabled=False)
+    instructor.inflight = SingleFlight(enabled=False)
+    jobs = [scenario for _ in range(repeat) for scenario in SCENARIOS]
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=parallelism) as pool:
+            runs = list(pool.map(bind_settings(lambda scenario: run_scenario(instructor, scenario)), jobs))
+        wall_time = time.perf_counter() - start
+    finally:
+        instructor.memo, instructor.inflight = saved
+    instructor.close()
+    
+    if show_results:
+        for run in runs[:len(SCENARIOS)]:
+            print_scenario(run)
     
-    scenario_1_vague_request()
-    scenario_2_specific_request()
-    scenario_3_api_development()
-    scenario_4_testing_improvement()
+    print_timing_table(runs, wall_time, parallelism)
     
-    print("✅ All scenarios completed!")
+    print("\n✅ All scenarios completed!")
     print("\nKey Takeaways:")
     print("- Vague requests generate clarifying questions")
     print("- Specific requests can generate direct instructions")
     print("- The framework adapts to different project types")
     print("- Progressive refinement builds context iteratively")
+    return runs
 
 def interactive_mode():
     """
@@ -253,22 +247,27 @@ def interactive_mode():
         except Exception as e:
             print(f"❌ Error: {e}")
 
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
 def main():
     """Main function."""
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "--interactive":
-            interactive_mode()
-        elif sys.argv[1] == "--help":
-            print("Agent Task Framework - Example Scenarios")
-            print()
-            print("Usage:")
-            print("  python example_scenarios.py           # Run all scenarios")
-            print("  python example_scenarios.py --interactive  # Interactive mode")
-            print("  python example_scenarios.py --help    # Show this help")
-        else:
-            print("Unknown option. Use --help for usage information.")
+    parser = argparse.ArgumentParser(description="Agent Task Framework - Example Scenarios")
+    parser.add_argument("--interactive", action="store_true", help="Interactive mode")
+    parser.add_argument("--parallel", type=positive_int, default=4, help="Maximum scenarios in flight (default: 4)")
+    parser.add_argument("--repeat", type=positive_int, default=1, help="Run the suite this many times, e.g. for a smoke-load test")
+    parser.add_argument("--quiet", action="store_true", help="Only print the timing table")
+    parser.add_argument("--output", help="Also export results to a sink, e.g. jsonl:results.jsonl or markdown:tasks/")
+    args = parser.parse_args()
+    
+    if args.interactive:
+        interactive_mode()
     else:
-        run_all_scenarios()
+        run_all_scenarios(parallelism=args.parallel, repeat=args.repeat, show_results=not args.quiet, output=args.output)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -7,12 +7,24 @@ then let the user choose which one to use.
 
 Usage:
     python final_instructor.py
+    python final_instructor.py --test
+    python final_instructor.py --profile [DIR]   # per-request traces, see atf/profiling.py
+    python final_instructor.py --output SPEC     # e.g. buffered,jsonl:out.jsonl, see atf/sinks.py
 """
 
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import dspy
+from atf.backends import create_lm
+from atf.concurrency import bind_settings
 from atf.main import ClarifierModule
+from atf.memo import StageMemo, fingerprint, normalize_request
+from atf.profiling import Profiler, profile_request, profiler_from_env, span
+from atf.scoring import focus_questions, score_principles
+from atf.singleflight import SingleFlight
+from atf.sinks import render_markdown, sink_from_env, sink_from_spec, unique_path
 
 class RequestAnalysisSignature(dspy.Signature):
     """
@@ -40,28 +52,56 @@ class FinalInstructionSignature(dspy.Signature):
     
     final_instruction = dspy.OutputField(desc="A high-level, fact-based instruction that tells the agent WHAT to accomplish using only details from the request. No assumptions about tools, libraries, or implementation methods.")
 
+# Refinement rounds before giving up on a request
+MAX_REFINEMENT_ROUNDS = 3
+
+# Marker separating the original request from each round's answers
+REFINEMENT_MARKER = "\n\n[Refinement "
+
+def add_refinement(request, round_number, answers):
+    """Append one refinement round's answers to the accumulated request."""
+    return f"{request}{REFINEMENT_MARKER}{round_number}]: {answers}"
+
+def original_request(request):
+    """The request as first submitted, without any refinement answers."""
+    return request.split(REFINEMENT_MARKER, 1)[0]
+
+# Tiny request used to prime each stage during warm-up
+WARMUP_REQUEST = "Add a README.md file to the repository root."
+
 class FinalInstructor:
-    def __init__(self):
+    def __init__(self, sink=None):
+        self.sink = sink if sink is not None else sink_from_env()
         self.clarifier = None
         self.instruction_generator = None
         self.analyzer = None
+        # Stage outputs are only memoized inside a session, see new_session()
+        self.memo = StageMemo(enabled=False)
+        self.inflight = SingleFlight()
+        self.profiler = None
+        self.ready = threading.Event()
+        self.warmup_errors = {}
+        self._warmup_thread = None
         
     def setup_dspy(self):
-        """Configure DSPy with Ollama model."""
+        """Configure DSPy with the configured LM backend (Ollama by default, see atf.backends)."""
         try:
-            ollama_model = dspy.OllamaLocal(model='llama3.2:latest', model_type='text', max_tokens=2048)
-            dspy.settings.configure(lm=ollama_model)
+            lm = create_lm()
+            dspy.settings.configure(lm=lm)
             return True
         except Exception as e:
-            print(f"❌ Error connecting to Ollama: {e}")
-            print("Make sure Ollama is running with: ollama serve")
+            print(f"❌ Error connecting to the LM backend: {e}")
+            print("Make sure Ollama is running with: ollama serve (or check atf_backend.json)")
             return False
     
-    def initialize(self):
-        """Initialize all components."""
+    def initialize(self, warm_up=False, background=True):
+        """Initialize all components, optionally warming up every stage."""
         if not self.setup_dspy():
             return False
             
+        if self.profiler is None:
+            self.profiler = profiler_from_env()
+            
         self.clarifier = ClarifierModule()
         if not self.clarifier.framework_principles:
             print("❌ Error: Could not load framework principles.")
@@ -70,8 +110,121 @@ class FinalInstructor:
         self.instruction_generator = dspy.ChainOfThought(FinalInstructionSignature)
         self.analyzer = dspy.ChainOfThought(RequestAnalysisSignature)
         
+        if warm_up:
+            self.warm_up(background=background)
+        else:
+            self.ready.set()
+        
         return True
     
+    def warm_up(self, background=True):
+        """
+        Prime every stage with a single-token generation so the first real
+        request doesn't pay for model load, connection setup and first-trace
+        overhead.
+        
+        Stages are primed concurrently. With background=True this returns
+        immediately; use is_ready() or wait_until_ready() to check progress,
+        and wait before the first real request so it doesn't queue behind the
+        priming calls on a single-slot server.
+        """
+        self.ready.clear()
+        self.warmup_errors = {}
+        
+        if background:
+            self._warmup_thread = threading.Thread(target=bind_settings(self._run_warm_up), name="atf-warm-up", daemon=True)
+            self._warmup_thread.start()
+        else:
+            self._run_warm_up()
+    
+    def _priming_config(self):
+        """Generation config capping each priming call at a single token."""
+        config = {'max_tokens': 1}
+        lm = dspy.settings.lm
+        if lm is not None and lm.provider == 'ollama':
+            # OllamaLocal sends num_predict, fixed from max_tokens at construction
+            config['num_predict'] = 1
+        return config
+    
+    def _run_warm_up(self):
+        """Run one single-token priming generation per stage and mark the instructor ready."""
+        config = self._priming_config()
+        stages = {
+            'analyzer': lambda: self.analyzer(user_request=WARMUP_REQUEST, config=config),
+            'clarifier': lambda: self.clarifier.clarifier(user_request=WARMUP_REQUEST, config=config,
+                                                          framework_principles=self.clarifier.framework_principles),
+            'instruction_generator': lambda: self.instruction_generator(user_request=WARMUP_REQUEST, config=config),
+        }
+        
+        try:
+            with ThreadPoolExecutor(max_workers=len(stages)) as pool:
+                futures = {name: pool.submit(bind_settings(stage)) for name, stage in stages.items()}
+                for name, future in futures.items():
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # A failed warm-up is not fatal; the stage will simply be cold
+                        self.warmup_errors[name] = e
+        finally:
+            self.ready.set()
+    
+    def is_ready(self):
+        """Return True once initialization (and any warm-up) has finished."""
+        return self.ready.is_set()
+    
+    def wait_until_ready(self, timeout=None):
+        """Block until warm-up has finished. Returns False if the timeout expired."""
+        return self.ready.wait(timeout)
+    
+    def new_session(self):
+        """
+        Start a fresh session, discarding memoized stage outputs.
+        
+        Within a session a request and its refinement rounds reuse stage
+        outputs; outside one (the default) every request runs every stage.
+        """
+        self.memo = StageMemo()
+    
+    def end_session(self):
+        """Stop memoizing and release the session's stage outputs."""
+        self.memo = StageMemo(enabled=False)
+    
+    def _run_stage(self, stage, inputs, compute):
+        """
+        Run one stage: reuse a memoized output, else join an identical in-flight
+        call from another thread, else compute it. Both are keyed on the LM
+        too, so outputs are never shared between different models.
+        """
+        with span(self.profiler, stage):
+            inputs = {**inputs, 'lm': id(dspy.settings.lm)}
+            key = (stage, fingerprint(inputs))
+            return self.memo.get_or_compute(stage, inputs, lambda: self.inflight.do(key, compute, kind=stage))
+    
+    def analyze(self, user_request):
+        """Run the specificity analyzer; it reads every answer, so it is keyed on the full request."""
+        inputs = {'user_request': normalize_request(user_request)}
+        return self._run_stage('analyzer', inputs, lambda: self.analyzer(user_request=user_request))
+    
+    def clarify(self, user_request):
+        """
+        Generate clarifying questions.
+        
+        Questions are keyed on the original request, the still-missing
+        principles and the framework principles, so they are reused until an
+        answer covers another principle or the principles file changes.
+        """
+        inputs = {
+            'user_request': normalize_request(original_request(user_request)),
+            'missing': score_principles(user_request).missing,
+            'framework_principles': self.clarifier.framework_principles,
+        }
+        return self._run_stage('clarifier', inputs, lambda: self.clarifier.forward(user_request=user_request))
+    
+    def instruct(self, user_request):
+        """Generate the final instruction; it depends on every answer, so it is keyed on the full request."""
+        inputs = {'user_request': normalize_request(user_request)}
+        return self._run_stage('instruction_generator', inputs, lambda: self.instruction_generator(user_request=user_request))
+    
     def get_multiline_input(self, prompt):
         """Get multiline input from user using ### as end marker."""
         print(f"{prompt} (type '###' on a new line to submit):")
@@ -83,58 +236,128 @@ class FinalInstructor:
             lines.append(line)
         return "\n".join(lines).strip()
     
-    def process_request(self, user_request):
-        """Process a user request and provide both options."""
-        print("🔄 Processing your request...\n")
+    def process_request(self, user_request, sink=None):
+        """
+        Process a user request and provide both options.
+        
+        Nothing is printed; progress and the result go to `sink` (defaults to
+        the instructor's sink, see atf.sinks).
+        
+        Concurrent identical requests (after whitespace normalization) made
+        with the same LM share one pipeline run; see self.inflight.stats() for
+        how many were coalesced. Only the caller that runs the pipeline gets
+        its progress messages: a caller that joins it receives a single
+        "Joining" status and then the result, because sinks such as the
+        buffered ConsoleSink collect messages per thread.
+        """
+        sink = sink or self.sink
+        key = ('request', id(dspy.settings.lm), normalize_request(user_request))
+        if self.inflight.is_in_flight(key):
+            sink.status("🔗 Joining an identical request already in progress...")
+        with profile_request(self.profiler, 'process_request'):
+            result = self.inflight.do(key, lambda: self._run_pipeline(user_request, sink), kind='request')
+        # Each caller gets its own copy of the shared result
+        result = dict(result) if result else result
+        sink.result(user_request, result)
+        return result
+    
+    def _run_pipeline(self, user_request, sink, coverage=None):
+        """
+        Run analyzer, clarifier and (if specific enough) instruction generator.
+        
+        With a principle `coverage`, clarifying questions are limited to the
+        still-missing principles, and skipped when every principle is covered
+        and the analyzer agrees the request is specific. The analyzer always
+        decides whether an instruction is generated.
+        """
+        sink.status("🔄 Processing your request...\n")
         
         try:
             # First, analyze if request has enough specifics
-            print("🔍 Analyzing request specificity...")
-            analysis = self.analyzer(user_request=user_request)
+            sink.status("🔍 Analyzing request specificity...")
+            analysis = self.analyze(user_request)
+            is_specific = "YES" in analysis.has_specifics.upper()
             
-            # Always generate clarifying questions
-            print("1️⃣ Generating clarifying questions...")
-            clarifying_result = self.clarifier.forward(user_request=user_request)
+            # Generate clarifying questions unless nothing is left to ask
+            clarifying_questions = None
+            if coverage is not None and coverage.is_complete and is_specific:
+                sink.status("1️⃣ All four principles are covered - no clarifying questions needed")
+            else:
+                sink.status("1️⃣ Generating clarifying questions...")
+                clarifying_questions = self.clarify(user_request).clarifying_questions
+                if coverage is not None:
+                    clarifying_questions = focus_questions(clarifying_questions, coverage.missing)
             
             # Only generate final instruction if request has specifics
             final_result = None
-            if "YES" in analysis.has_specifics.upper():
-                print("2️⃣ Generating direct instruction...")
-                final_result = self.instruction_generator(user_request=user_request)
+            if is_specific:
+                sink.status("2️⃣ Generating direct instruction...")
+                final_result = self.instruct(user_request)
             else:
-                print("2️⃣ Request too vague for direct instruction (would require inventing details)")
-                print(f"   Reason: {analysis.reasoning}")
-            
-            print("\n" + "=" * 60)
-            print("📋 OPTION 1: CLARIFYING QUESTIONS")
-            print("=" * 60)
-            print("Use these if you want to refine your request further:\n")
-            print(clarifying_result.clarifying_questions)
-            
-            if final_result:
-                print("\n" + "=" * 60)
-                print("🚀 OPTION 2: READY-TO-USE INSTRUCTION")
-                print("=" * 60)
-                print("Copy this directly to your background agent:\n")
-                print(final_result.final_instruction)
-                print("=" * 60)
-            else:
-                print("\n" + "=" * 60)
-                print("🚀 OPTION 2: NOT AVAILABLE")
-                print("=" * 60)
-                print("Request is too vague to create actionable instructions.")
-                print("Please use the clarifying questions above to add more details.")
-                print("=" * 60)
+                sink.status("2️⃣ Request too vague for direct instruction (would require inventing details)")
+                sink.status(f"   Reason: {analysis.reasoning}")
             
             return {
-                'clarifying_questions': clarifying_result.clarifying_questions,
+                'clarifying_questions': clarifying_questions,
                 'final_instruction': final_result.final_instruction if final_result else None
             }
                 
         except Exception as e:
-            print(f"❌ Error processing request: {e}")
+            sink.status(f"❌ Error processing request: {e}")
             return None
     
+    def refine(self, current_request, previous_result=None, sink=None):
+        """
+        Process one refinement round, skipping LM work the answers made unnecessary.
+        
+        The accumulated request is scored locally against the four principles.
+        Only questions for still-missing principles are asked, and none once
+        all are covered and the analyzer agrees the request is specific. The
+        previous round's questions are kept when no new ones were needed.
+        """
+        sink = sink or self.sink
+        with profile_request(self.profiler, 'refine'):
+            result = self._refine(current_request, previous_result, sink)
+        sink.result(current_request, result)
+        return result
+    
+    def _refine(self, current_request, previous_result, sink):
+        with span(self.profiler, 'principle_scoring'):
+            coverage = score_principles(current_request)
+        
+        result = self._run_pipeline(current_request, sink, coverage)
+        if result:
+            if result['clarifying_questions'] is None and previous_result:
+                result['clarifying_questions'] = previous_result['clarifying_questions']
+            result['missing_principles'] = coverage.missing
+        return result
+    
+    def export(self, filename, text, default_stem):
+        """
+        Write a file export and return its path; raises OSError if it fails.
+        
+        Without a filename a unique one is generated, so earlier exports are
+        never overwritten.
+        """
+        path = filename or unique_path('.', default_stem, '.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+    
+    def save(self, filename, text, default_stem):
+        """Export to a file, reporting success or failure to the user."""
+        try:
+            path = self.export(filename, text, default_stem)
+        except OSError as e:
+            print(f"❌ Error saving file: {e}")
+            return None
+        print(f"💾 Saved to {path}")
+        return path
+    
+    def close(self):
+        """Flush pending output."""
+        self.sink.flush()
+    
     def interactive_mode(self):
         """Interactive mode for processing requests."""
         print("🎯 Final Instructor - Direct Background Agent Instructions")
@@ -156,6 +379,13 @@ class FinalInstructor:
                 
                 print(f"\n📥 Processing request ({len(user_request)} characters)...\n")
                 
+                if not self.is_ready():
+                    print("⏳ Waiting for warm-up to finish...")
+                    self.wait_until_ready()
+                
+                # Each top-level request and its refinement rounds form one session
+                self.new_session()
+                
                 result = self.process_request(user_request)
                 
                 if result:
@@ -185,18 +415,18 @@ class FinalInstructor:
                             # Show the current state
                             print(f"📋 Current Request:\n{current_request}\n")
                             print("🤔 Clarifying Questions to Answer:")
-                            print(result['clarifying_questions'])
+                            print(focus_questions(result['clarifying_questions'], score_principles(current_request).missing))
                             print()
                             
                             answers = self.get_multiline_input("📝 Provide answers to any/all of the questions above")
                             
                             if answers:
                                 # Progressively build the request
-                                current_request = f"{current_request}\n\n[Refinement {refinement_count}]: {answers}"
+                                current_request = add_refinement(current_request, refinement_count, answers)
                                 print(f"\n🔄 Processing refined request (Round {refinement_count})...")
                                 
                                 # Process the enhanced request
-                                refined_result = self.process_request(current_request)
+                                refined_result = self.refine(current_request, result)
                                 if refined_result:
                                     if refined_result['final_instruction']:
                                         print(f"\n✅ Refinement successful after {refinement_count} round(s)!")
@@ -207,8 +437,8 @@ class FinalInstructor:
                                         result = refined_result  # Update for next iteration
                                         refinement_count += 1
                                         
-                                        if refinement_count > 3:
-                                            print("\n🛑 Reached maximum refinement rounds (3).")
+                                        if refinement_count > MAX_REFINEMENT_ROUNDS:
+                                            print(f"\n🛑 Reached maximum refinement rounds ({MAX_REFINEMENT_ROUNDS}).")
                                             print("The request may be too complex for this tool.")
                                             break
                                 else:
@@ -220,37 +450,16 @@ class FinalInstructor:
                     
                     elif choice == "2" and not has_instruction:
                         # Save just clarifying questions for vague requests
-                        filename = input("Enter filename (default: clarifying_questions.txt): ").strip()
-                        if not filename:
-                            filename = "clarifying_questions.txt"
-                        
-                        try:
-                            with open(filename, 'w') as f:
-                                f.write("# Background Agent Task - Clarifying Questions\n\n")
-                                f.write(f"## Original Request\n{user_request}\n\n")
-                                f.write(f"## Clarifying Questions\n{result['clarifying_questions']}\n\n")
-                                f.write("## Next Steps\nAnswer the questions above and re-run with more details.\n")
-                            print(f"✅ Saved clarifying questions to {filename}")
-                        except Exception as e:
-                            print(f"❌ Error saving file: {e}")
+                        filename = input("Enter filename (default: unique clarifying_questions-*.txt): ").strip()
+                        text = "# Background Agent Task - Clarifying Questions\n\n"
+                        text += f"## Original Request\n{user_request}\n\n"
+                        text += f"## Clarifying Questions\n{result['clarifying_questions']}\n\n"
+                        text += "## Next Steps\nAnswer the questions above and re-run with more details.\n"
+                        self.save(filename, text, 'clarifying_questions')
                     
                     elif choice == "3" or (choice == "2" and has_instruction):
-                        filename = input("Enter filename (default: agent_task.txt): ").strip()
-                        if not filename:
-                            filename = "agent_task.txt"
-                        
-                        try:
-                            with open(filename, 'w') as f:
-                                f.write("# Background Agent Task\n\n")
-                                f.write(f"## Original Request\n{user_request}\n\n")
-                                f.write(f"## Clarifying Questions\n{result['clarifying_questions']}\n\n")
-                                if result['final_instruction']:
-                                    f.write(f"## Ready-to-Use Instruction\n{result['final_instruction']}\n")
-                                else:
-                                    f.write("## Ready-to-Use Instruction\nNot available - request too vague.\n")
-                            print(f"✅ Saved to {filename}")
-                        except Exception as e:
-                            print(f"❌ Error saving file: {e}")
+                        filename = input("Enter filename (default: unique agent_task-*.txt): ").strip()
+                        self.save(filename, render_markdown(user_request, result), 'agent_task')
                     
                     elif choice == "2":
                         if result['final_instruction']:
@@ -262,6 +471,7 @@ class FinalInstructor:
                             print("\n❌ No ready-to-use instruction available.")
                             print("The request was too vague. Please try option 1 to refine it.")
                 
+                self.end_session()
                 print("\n" + "=" * 60 + "\n")
                 
             except KeyboardInterrupt:
@@ -269,15 +479,36 @@ class FinalInstructor:
                 break
             except Exception as e:
                 print(f"❌ Unexpected error: {e}\n")
+        
+        # Make sure queued output and exports reach the disk before exiting
+        self.close()
+
+def option_value(name, default):
+    """Value following a command-line option, or default if it has none."""
+    index = sys.argv.index(name)
+    if len(sys.argv) > index + 1 and not sys.argv[index + 1].startswith("--"):
+        return sys.argv[index + 1]
+    return default
 
 def main():
     """Main function."""
-    instructor = FinalInstructor()
+    # Output goes to the console unless --output / ATF_OUTPUT says otherwise (see atf/sinks.py)
+    if "--output" in sys.argv[1:]:
+        sink = sink_from_spec(option_value("--output", "console"))
+    else:
+        sink = sink_from_env(default='console')
+    instructor = FinalInstructor(sink=sink)
+    test_mode = "--test" in sys.argv[1:]
+    
+    if "--profile" in sys.argv[1:]:
+        # Write per-request traces (see atf/profiling.py); same as ATF_PROFILE=<dir>
+        instructor.profiler = Profiler(option_value("--profile", "profiles"))
     
-    if not instructor.initialize():
+    # Warm up in the background while the user types their first request
+    if not instructor.initialize(warm_up=not test_mode):
         return
     
-    if len(sys.argv) > 1 and sys.argv[1] == "--test":
+    if test_mode:
         # Test with your detailed request
         detailed_request = """Analyze reviews in samples/tp_dea_reviews.json to identify:
 1. Sentiment distribution across star ratings
@@ -290,6 +521,7 @@ Success criteria: Report includes at least 50 review samples and actionable insi
         
         print("🧪 Testing with detailed request...")
         instructor.process_request(detailed_request)
+        instructor.close()
     else:
         instructor.interactive_mode()
 
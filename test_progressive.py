@@ -1,11 +1,17 @@
 #!/usr/bin/env python3
 """
 Test script to validate progressive refinement functionality
+
+Runs against a live Ollama server by default. To run offline and
+deterministically, record once and replay afterwards:
+    ATF_RECORD=traces/progressive.jsonl.gz python test_progressive.py
+    ATF_REPLAY=traces/progressive.jsonl.gz python test_progressive.py
 """
 import sys
 sys.path.append('.')
 
 from final_instructor import FinalInstructor
+from atf.sinks import ConsoleSink
 
 def test_progressive_refinement():
     """Test the progressive refinement logic"""
@@ -13,7 +19,7 @@ def test_progressive_refinement():
     print("=" * 50)
     
     # Initialize
-    fi = FinalInstructor()
+    fi = FinalInstructor(sink=ConsoleSink())
     if not fi.initialize():
         print("❌ Failed to initialize FinalInstructor")
         return False
@@ -0,0 +1,27 @@
+import pytest
+import dspy
+from dspy.utils import DummyLM
+
+# Canned completions keyed by the output field each stage's prompt ends with
+FAKE_ANSWERS = {
+    "Has Specifics:": "check for concrete details.\n\nHas Specifics: YES\n\nReasoning: The request names a specific file.",
+    "Clarifying Questions:": "cover each principle.\n\nClarifying Questions: **OBJECTIVE:** What is the goal?\n**SCOPE:** Which files?\n**DELIVERABLE:** What output?\n**SUCCESS:** How is it validated?",
+    "Final Instruction:": "restate the request.\n\nFinal Instruction: Add a README.md file describing the project.",
+}
+
+@pytest.fixture
+def fake_lm():
+    """A local fake LM that answers every FinalInstructor stage without a server."""
+    lm = DummyLM(dict(FAKE_ANSWERS))
+    with dspy.settings.context(lm=lm):
+        yield lm
+
+@pytest.fixture
+def instructor(fake_lm):
+    """A FinalInstructor initialized against the fake LM."""
+    from final_instructor import FinalInstructor
+    
+    fi = FinalInstructor()
+    fi.setup_dspy = lambda: True
+    assert fi.initialize()
+    return fi
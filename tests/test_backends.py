@@ -0,0 +1,157 @@
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import dspy
+import pytest
+
+from atf.backends import BatchCompletionLM, MicroBatcher, create_lm, generate_batch, load_backend_config
+
+class CompletionStub(BaseHTTPRequestHandler):
+    """Minimal llama.cpp / vLLM style /completions endpoint that accepts prompt lists."""
+    requests_seen = []
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompts = payload['prompt'] if isinstance(payload['prompt'], list) else [payload['prompt']]
+        self.requests_seen.append(len(prompts))
+        body = json.dumps({'choices': [
+            {'index': i, 'text': f"echo {p.splitlines()[-1]}", 'finish_reason': 'stop'}
+            for i, p in enumerate(prompts)
+        ]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_server():
+    CompletionStub.requests_seen = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CompletionStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+
+def test_batch_generate_sends_one_request(stub_server):
+    lm = BatchCompletionLM('stub', base_url=stub_server)
+    
+    assert lm.batch_generate(["a", "b", "c"]) == [["echo a"], ["echo b"], ["echo c"]]
+    assert CompletionStub.requests_seen == [3]
+    assert [(h['prompt'], h['response']['choices'][0]['text']) for h in lm.history] == [
+        ("a", "echo a"), ("b", "echo b"), ("c", "echo c")]
+
+def test_concurrent_calls_are_micro_batched(stub_server):
+    lm = BatchCompletionLM('stub', base_url=stub_server, max_batch_size=8, max_wait_ms=200)
+    prompts = [f"prompt {i}" for i in range(8)]
+    
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lm, prompts))
+    
+    assert results == [[f"echo {p}"] for p in prompts]
+    assert sum(CompletionStub.requests_seen) == 8
+    assert len(CompletionStub.requests_seen) < 8
+
+def test_micro_batcher_keeps_kwargs_apart():
+    batches = []
+    def batch_fn(prompts, **kwargs):
+        batches.append((tuple(prompts), kwargs))
+        return [p.upper() for p in prompts]
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_s=0.2)
+    
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(batcher.submit, p, temperature=t) for p, t in [("a", 0), ("b", 0), ("c", 1), ("d", 1)]]
+        results = [f.result() for f in futures]
+    
+    assert results == ["A", "B", "C", "D"]
+    expected = {"a": 0, "b": 0, "c": 1, "d": 1}
+    assert all(expected[p] == kwargs['temperature'] for prompts, kwargs in batches for p in prompts)
+    assert sum(len(p) for p, _ in batches) == 4
+
+def test_micro_batcher_propagates_errors():
+    def batch_fn(prompts, **kwargs):
+        raise RuntimeError("server down")
+    batcher = MicroBatcher(batch_fn, max_wait_s=0)
+    
+    with pytest.raises(RuntimeError, match="server down"):
+        batcher.submit("a")
+
+def test_micro_batcher_fails_prompts_without_a_result():
+    batcher = MicroBatcher(lambda prompts, **kwargs: ["only one"], max_batch_size=2, max_wait_s=0.2)
+    
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(batcher.submit, p) for p in ("a", "b")]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="1 results for 2 prompts"):
+                future.result()
+
+def test_micro_batcher_times_out():
+    release = threading.Event()
+    def batch_fn(prompts, **kwargs):
+        release.wait(5)
+        return prompts
+    batcher = MicroBatcher(batch_fn, max_wait_s=0, timeout_s=0.05)
+    
+    with pytest.raises(TimeoutError):
+        batcher.submit("a")
+    release.set()
+    batcher.timeout_s = 5
+    assert batcher.submit("b") == "b"
+
+def test_micro_batcher_timeout_excludes_queue_time():
+    def batch_fn(prompts, **kwargs):
+        time.sleep(0.1)
+        return prompts
+    batcher = MicroBatcher(batch_fn, max_batch_size=1, max_wait_s=0, timeout_s=0.3)
+    prompts = list("abcdef")
+    
+    # The last prompt queues for ~0.5s, longer than the timeout, yet succeeds
+    with ThreadPoolExecutor(max_workers=len(prompts)) as pool:
+        results = list(pool.map(batcher.submit, prompts))
+    
+    assert results == prompts
+    assert batcher.batches == len(prompts)
+
+def test_micro_batcher_skips_cancelled_prompts():
+    batches = []
+    batcher = MicroBatcher(lambda prompts, **kwargs: batches.append(prompts) or prompts, max_batch_size=2, max_wait_s=0.2)
+    cancelled = Future()
+    cancelled.cancel()
+    batcher._queue.put(("dropped", {}, cancelled, threading.Event()))
+    
+    assert batcher.submit("kept") == "kept"
+    assert batches == [["kept"]]
+
+def test_generate_batch_falls_back_to_single_calls(fake_lm):
+    assert len(generate_batch(fake_lm, ["Final Instruction:", "Has Specifics:"])) == 2
+    assert len(fake_lm.history) == 2
+
+def test_backend_config_file(tmp_path, monkeypatch, stub_server):
+    config = tmp_path / "atf_backend.json"
+    config.write_text(json.dumps({'backend': 'openai_compatible', 'model': 'stub', 'base_url': stub_server}))
+    monkeypatch.setenv('ATF_BACKEND_CONFIG', str(config))
+    monkeypatch.delenv('ATF_RECORD', raising=False)
+    monkeypatch.delenv('ATF_REPLAY', raising=False)
+    
+    assert load_backend_config()['max_tokens'] == 2048
+    lm = create_lm()
+    assert isinstance(lm, BatchCompletionLM)
+    assert isinstance(create_lm({'backend': 'ollama', 'model': 'llama3.2:latest'}), dspy.OllamaLocal)
+    with pytest.raises(ValueError):
+        create_lm({'backend': 'nope'})
+
+def test_missing_backend_config_fails(tmp_path, monkeypatch):
+    monkeypatch.setenv('ATF_BACKEND_CONFIG', str(tmp_path / "missing.json"))
+    with pytest.raises(FileNotFoundError):
+        load_backend_config()
+    
+    monkeypatch.delenv('ATF_BACKEND_CONFIG')
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "atf_backend.json").write_text(json.dumps({'backend': 'openai_compatible'}))
+    assert load_backend_config()['backend'] == 'ollama'
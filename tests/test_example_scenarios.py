@@ -0,0 +1,34 @@
+import sys
+
+import pytest
+
+from examples.example_scenarios import SCENARIOS, main, percentile, run_all_scenarios
+
+def test_scenarios_run_concurrently_on_shared_instructor(instructor, fake_lm, capsys):
+    memo, inflight = instructor.memo, instructor.inflight
+    runs = run_all_scenarios(parallelism=4, repeat=2, show_results=False, instructor=instructor)
+    
+    assert len(runs) == 2 * len(SCENARIOS)
+    assert all(run['result'] is not None for run in runs)
+    # Memoization and coalescing are disabled so every run reaches the LM
+    assert len(fake_lm.history) == 3 * len(runs)
+    assert instructor.memo is memo and instructor.inflight is inflight
+    
+    output = capsys.readouterr().out
+    for scenario in SCENARIOS:
+        assert scenario['name'] in output
+    assert "Throughput" in output
+
+def test_percentile_uses_nearest_rank():
+    values = [1, 2, 3, 4]
+    assert percentile(values, 50) == 2
+    assert percentile(values, 62.5) == 3
+    assert percentile([1, 2, 3, 4, 5, 6], 25) == 2
+    assert percentile(values, 95) == 4
+
+@pytest.mark.parametrize("flag", ["--repeat", "--parallel"])
+def test_counts_must_be_positive(monkeypatch, flag):
+    monkeypatch.setattr(sys, "argv", ["example_scenarios.py", flag, "0"])
+    with pytest.raises(SystemExit) as excinfo:
+        main()
+    assert excinfo.value.code == 2
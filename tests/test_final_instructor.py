@@ -0,0 +1,131 @@
+import dspy
+
+from final_instructor import add_refinement
+
+def test_process_request_returns_both_options(instructor):
+    result = instructor.process_request("Add a README.md file")
+    
+    assert result['clarifying_questions'].startswith("**OBJECTIVE:**")
+    assert result['final_instruction'] == "Add a README.md file describing the project."
+
+def test_initialize_without_warm_up_is_ready(instructor):
+    assert instructor.is_ready()
+
+def test_warm_up_primes_every_stage(instructor, fake_lm):
+    instructor.warm_up(background=False)
+    
+    assert instructor.is_ready()
+    assert instructor.warmup_errors == {}
+    assert len(fake_lm.history) == 3
+    assert all(h['kwargs']['max_tokens'] == 1 for h in fake_lm.history)
+
+def test_background_warm_up_exposes_readiness(instructor):
+    instructor.warm_up(background=True)
+    
+    assert instructor.wait_until_ready(timeout=10)
+    assert instructor.warmup_errors == {}
+
+def test_warm_up_records_stage_failures(instructor):
+    def broken(**kwargs):
+        raise RuntimeError("model unavailable")
+    instructor.analyzer = broken
+    
+    instructor.warm_up(background=False)
+    
+    assert instructor.is_ready()
+    assert list(instructor.warmup_errors) == ['analyzer']
+
+def test_unchanged_request_reuses_memoized_stages(instructor, fake_lm):
+    instructor.new_session()
+    instructor.process_request("Add a README.md file")
+    instructor.process_request("Add a   README.md file\n")
+    
+    assert len(fake_lm.history) == 3
+    assert instructor.memo.stats()['hits'] == 3
+
+def test_requests_outside_a_session_are_not_memoized(instructor, fake_lm):
+    instructor.process_request("Add a README.md file")
+    instructor.process_request("Add a README.md file")
+    
+    assert len(fake_lm.history) == 6
+    assert len(instructor.memo) == 0
+
+def test_memo_is_keyed_on_the_lm(instructor, fake_lm):
+    other_lm = dspy.utils.DummyLM({**fake_lm.answers, "Final Instruction:": "restate.\n\nFinal Instruction: From the other model."})
+    instructor.new_session()
+    instructor.process_request("Add a README.md file")
+    
+    with dspy.settings.context(lm=other_lm):
+        result = instructor.process_request("Add a README.md file")
+    
+    assert len(other_lm.history) == 3
+    assert result['final_instruction'] == "From the other model."
+
+def test_changed_principles_only_invalidate_clarifier(instructor, fake_lm):
+    instructor.new_session()
+    instructor.process_request("Add a README.md file")
+    instructor.clarifier.framework_principles += "\nExtra principle."
+    instructor.process_request("Add a README.md file")
+    
+    assert len(fake_lm.history) == 4
+    assert "Clarifying Questions:" in fake_lm.history[-1]['prompt']
+
+def test_refinement_rounds_only_redo_affected_stages(instructor, fake_lm):
+    fake_lm.answers["Has Specifics:"] = "judge.\n\nHas Specifics: NO\n\nReasoning: Nothing concrete."
+    instructor.new_session()
+    
+    request = "Speed up our nightly ETL job"
+    first = instructor.process_request(request)
+    assert len(fake_lm.history) == 2
+    
+    # The analyzer sees every answer, even ones the principle scorer misses;
+    # questions are reused while the same principles are missing
+    request = add_refinement(request, 1, "It is slow and people complain about it.")
+    second = instructor.refine(request, first)
+    assert len(fake_lm.history) == 3
+    assert second['final_instruction'] is None
+    
+    fake_lm.answers["Has Specifics:"] = "judge.\n\nHas Specifics: YES\n\nReasoning: Concrete enough."
+    request = add_refinement(request, 2, "It is the Airflow DAG that loads Postgres into Snowflake; "
+                                         "rewrite the dedupe step in SQL so the runtime drops from 4 hours to 1.")
+    third = instructor.refine(request, second)
+    assert len(fake_lm.history) == 5
+    assert third['final_instruction'] == "Add a README.md file describing the project."
+
+def test_new_session_discards_memo(instructor, fake_lm):
+    instructor.new_session()
+    instructor.process_request("Add a README.md file")
+    instructor.new_session()
+    instructor.process_request("Add a README.md file")
+    
+    assert len(fake_lm.history) == 6
+
+def test_refine_skips_questions_but_keeps_analyzer_when_covered(instructor, fake_lm):
+    request = ("Fix the crash in src/parser.py. Output: a modified parser.py. "
+               "Success: all tests pass.")
+    
+    result = instructor.refine(request, {'clarifying_questions': "previous"})
+    
+    prompts = [h['prompt'] for h in fake_lm.history]
+    assert len(prompts) == 2
+    assert "Has Specifics:" in prompts[0]
+    assert result['final_instruction'] == "Add a README.md file describing the project."
+    assert result['clarifying_questions'] == "previous"
+    assert result['missing_principles'] == []
+
+def test_refine_never_bypasses_a_vague_verdict(instructor, fake_lm):
+    fake_lm.answers["Has Specifics:"] = "judge.\n\nHas Specifics: NO\n\nReasoning: Nothing concrete."
+    request = ("Improve the pipeline\n\n[Refinement 1]: I don't know which files. "
+               "No report needed. Not sure what success looks like.")
+    
+    result = instructor.refine(request)
+    
+    assert result['final_instruction'] is None
+    assert result['missing_principles'] == ['objective', 'scope', 'deliverable', 'success']
+
+def test_refine_asks_only_about_missing_principles(instructor, fake_lm):
+    result = instructor.refine("Fix the crash in src/parser.py")
+    
+    assert len(fake_lm.history) == 3
+    assert result['missing_principles'] == ['deliverable', 'success']
+    assert result['clarifying_questions'] == "**DELIVERABLE:** What output?\n**SUCCESS:** How is it validated?"
@@ -0,0 +1,44 @@
+import json
+import pstats
+
+from atf.profiling import Profiler, profiler_from_env
+
+def load_traces(directory):
+    return [json.loads(p.read_text()) for p in sorted(directory.glob("*.trace.json"))]
+
+def test_profiled_request_writes_chrome_trace_and_cprofile(instructor, tmp_path):
+    instructor.profiler = Profiler(str(tmp_path))
+    
+    instructor.process_request("Add a README.md file")
+    
+    [trace] = load_traces(tmp_path)
+    names = [e['name'] for e in trace['traceEvents']]
+    assert names.count('lm') == 3
+    assert {'process_request', 'analyzer', 'clarifier', 'instruction_generator'} <= set(names)
+    assert all(e['ph'] == 'X' and 'cpu_ms' in e['args'] for e in trace['traceEvents'])
+    
+    summary = trace['otherData']
+    assert summary['lm_calls'] == 3
+    assert summary['wall_ms'] >= summary['lm_wait_ms']
+    assert summary['python_ms'] == round(summary['wall_ms'] - summary['lm_wait_ms'], 3)
+    
+    [prof] = tmp_path.glob("*.prof")
+    assert pstats.Stats(str(prof)).total_calls > 0
+
+def test_nested_refine_joins_one_trace(instructor, tmp_path):
+    instructor.profiler = Profiler(str(tmp_path), use_cprofile=False)
+    
+    instructor.refine("Fix the crash in src/parser.py")
+    instructor.process_request("Add a README.md file")
+    
+    traces = load_traces(tmp_path)
+    assert len(traces) == 2
+    assert not list(tmp_path.glob("*.prof"))
+
+def test_profiling_is_off_by_default(instructor, tmp_path, monkeypatch):
+    monkeypatch.delenv("ATF_PROFILE", raising=False)
+    assert profiler_from_env() is None
+    assert instructor.profiler is None
+    
+    monkeypatch.setenv("ATF_PROFILE", str(tmp_path / "profiles"))
+    assert isinstance(profiler_from_env(), Profiler)
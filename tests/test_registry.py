@@ -0,0 +1,121 @@
+import json
+import os
+import time
+
+import dspy
+import pytest
+
+import atf.main
+from atf.main import TRAIN_SET_PATH, ClarifierModule, save_demos
+from atf.registry import Corpus, Registry
+
+@pytest.fixture
+def fresh_registry(monkeypatch):
+    reg = Registry(check_interval=0, background_reload=False)
+    monkeypatch.setattr(atf.main, "registry", reg)
+    return reg
+
+def write(path, text, mtime_offset=0):
+    path.write_text(text, encoding='utf-8')
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + mtime_offset))
+
+def test_principles_loaded_once_and_shared(fresh_registry, tmp_path):
+    path = tmp_path / "principles.md"
+    write(path, "Objective, Scope, Deliverable, Success")
+    
+    first, second = ClarifierModule(str(path)), ClarifierModule(str(path))
+    
+    assert first.framework_principles is second.framework_principles
+    assert fresh_registry.loads == 1
+
+def test_principles_hot_reload(fresh_registry, tmp_path):
+    path = tmp_path / "principles.md"
+    write(path, "old principles")
+    clarifier = ClarifierModule(str(path))
+    
+    write(path, "new principles", mtime_offset=10**9)
+    
+    assert clarifier.framework_principles == "new principles"
+
+@pytest.mark.parametrize("change", ["delete", "rename", "empty"])
+def test_reload_keeps_previous_version_when_file_goes_away(fresh_registry, tmp_path, capsys, change):
+    path = tmp_path / "principles.md"
+    write(path, "old principles")
+    assert fresh_registry.principles(str(path)) == "old principles"
+    
+    if change == "delete":
+        path.unlink()
+    elif change == "rename":
+        path.rename(tmp_path / "principles.old.md")
+    else:
+        write(path, "", mtime_offset=10**9)
+    
+    assert fresh_registry.principles(str(path)) == "old principles"
+    assert fresh_registry.principles(str(path)) == "old principles"
+    assert capsys.readouterr().err.count("keeping the previously loaded version") == 1
+    
+    write(path, "new principles", mtime_offset=2 * 10**9)
+    assert fresh_registry.principles(str(path)) == "new principles"
+
+def test_background_reload_keeps_serving_previous_version(tmp_path):
+    reg = Registry(check_interval=0, background_reload=True)
+    path = tmp_path / "principles.md"
+    write(path, "old principles")
+    assert reg.principles(str(path)) == "old principles"
+    
+    write(path, "new principles", mtime_offset=10**9)
+    served = reg.principles(str(path))
+    
+    assert served in ("old principles", "new principles")
+    deadline = time.monotonic() + 5
+    while reg.principles(str(path)) != "new principles" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert reg.principles(str(path)) == "new principles"
+
+def test_corpus_is_lazily_indexed(tmp_path):
+    path = tmp_path / "train.jsonl"
+    rows = [{"user_request": f"request {i}", "clarifying_questions": f"questions {i}"} for i in range(5)]
+    path.write_text("\n".join(json.dumps(r) for r in rows) + "\n\n", encoding='utf-8')
+    
+    corpus = Corpus(str(path), input_keys=("user_request",))
+    
+    assert len(corpus) == 5
+    assert corpus[-1].user_request == "request 4"
+    assert corpus[2].inputs().keys() == ["user_request"]
+    assert [e.clarifying_questions for e in corpus] == [r["clarifying_questions"] for r in rows]
+    with pytest.raises(IndexError):
+        corpus[5]
+
+def test_demos_are_passed_to_the_clarifier(fresh_registry, fake_lm, tmp_path):
+    principles = tmp_path / "principles.md"
+    write(principles, "Objective, Scope, Deliverable, Success")
+    demos = tmp_path / "demos.jsonl"
+    demos.write_text(json.dumps({"user_request": "Fix the login page", "clarifying_questions": "**OBJECTIVE:** Which bug?"}) + "\n")
+    
+    ClarifierModule(str(principles), demos_path=str(demos)).forward(user_request="Add a README.md file")
+    
+    assert "Fix the login page" in fake_lm.history[-1]['prompt']
+
+def test_training_set_is_served_by_the_registry(fresh_registry):
+    train_set = fresh_registry.corpus(TRAIN_SET_PATH)
+    
+    assert len(train_set) == 3
+    assert train_set[0].inputs().keys() == ["user_request"]
+    assert fresh_registry.corpus(TRAIN_SET_PATH) is train_set
+
+def test_compiled_demos_are_used_by_default(fresh_registry, fake_lm, tmp_path, monkeypatch):
+    principles = tmp_path / "principles.md"
+    write(principles, "Objective, Scope, Deliverable, Success")
+    demos = tmp_path / "clarifier_demos.jsonl"
+    monkeypatch.setattr(atf.main, "COMPILED_DEMOS_PATH", str(demos))
+    compiled = ClarifierModule(str(principles))
+    compiled.clarifier.demos = [dspy.Example(user_request="Fix the login page", clarifying_questions="**OBJECTIVE:** Which bug?",
+                                             framework_principles="not saved")]
+    
+    save_demos(compiled, str(demos))
+    
+    assert [json.loads(line) for line in demos.read_text().splitlines()] == [
+        {"user_request": "Fix the login page", "clarifying_questions": "**OBJECTIVE:** Which bug?"}]
+    ClarifierModule(str(principles)).forward(user_request="Add a README.md file")
+    assert "Fix the login page" in fake_lm.history[-1]['prompt']
@@ -0,0 +1,80 @@
+import subprocess
+import sys
+import time
+
+import pytest
+import dspy
+
+from atf.replay import RecordingLM, ReplayLM, lm_from_env, load_trace
+
+REQUEST = "Add a README.md file"
+
+def record_trace(instructor, fake_lm, path):
+    recorder = RecordingLM(fake_lm, str(path))
+    with dspy.settings.context(lm=recorder):
+        result = instructor.process_request(REQUEST)
+    recorder.close()
+    return result
+
+@pytest.mark.parametrize("name", ["trace.jsonl", "trace.jsonl.gz"])
+def test_record_then_replay_reproduces_results(instructor, fake_lm, tmp_path, name):
+    path = tmp_path / name
+    recorded = record_trace(instructor, fake_lm, path)
+    
+    records = load_trace(str(path))
+    assert len(records) == 3
+    assert all(r['elapsed_s'] >= 0 for r in records)
+    
+    instructor.new_session()
+    with dspy.settings.context(lm=ReplayLM(str(path))):
+        replayed = instructor.process_request(REQUEST)
+    
+    assert replayed == recorded
+    assert len(fake_lm.history) == 3
+
+def test_replay_realtime_honours_recorded_latency(instructor, fake_lm, tmp_path):
+    path = tmp_path / "trace.jsonl"
+    record_trace(instructor, fake_lm, path)
+    replay = ReplayLM(str(path), realtime=True)
+    for records in replay._responses.values():
+        for record in records:
+            record['elapsed_s'] = 0.05
+    
+    instructor.new_session()
+    start = time.perf_counter()
+    with dspy.settings.context(lm=replay):
+        instructor.process_request(REQUEST)
+    
+    assert time.perf_counter() - start >= 0.15
+
+def test_replay_unknown_prompt_fails(instructor, fake_lm, tmp_path):
+    path = tmp_path / "trace.jsonl"
+    record_trace(instructor, fake_lm, path)
+    
+    instructor.new_session()
+    with dspy.settings.context(lm=ReplayLM(str(path))):
+        assert instructor.process_request("Something never recorded") is None
+
+def test_lm_from_env(monkeypatch, fake_lm, tmp_path):
+    path = tmp_path / "trace.jsonl"
+    monkeypatch.delenv("ATF_REPLAY", raising=False)
+    monkeypatch.setenv("ATF_RECORD", str(path))
+    assert isinstance(lm_from_env(lambda: fake_lm), RecordingLM)
+    
+    monkeypatch.setenv("ATF_REPLAY", str(path))
+    assert isinstance(lm_from_env(lambda: fake_lm), ReplayLM)
+
+def test_gzip_trace_survives_exit_without_close(tmp_path):
+    path = tmp_path / "trace.jsonl.gz"
+    script = (
+        "from dspy.utils import DummyLM\n"
+        "from atf.replay import RecordingLM\n"
+        f"recorder = RecordingLM(DummyLM(['first', 'second']), {str(path)!r})\n"
+        "recorder('prompt one')\n"
+        "recorder('prompt two')\n"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True, capture_output=True)
+    
+    assert [r['completions'] for r in load_trace(str(path))] == [['first'], ['second']]
+    replay = ReplayLM(str(path))
+    assert replay('prompt two') == ['second']
@@ -0,0 +1,54 @@
+from atf.scoring import PRINCIPLES, focus_questions, score_principles
+
+QUESTIONS = "**OBJECTIVE:** What is the goal?\n**SCOPE:** Which files?\n**DELIVERABLE:** What output?\n**SUCCESS:** How is it validated?"
+
+def test_vague_request_covers_nothing():
+    coverage = score_principles("Improve the data processing pipeline")
+    
+    assert coverage.missing == PRINCIPLES
+    assert not coverage.is_complete
+
+def test_bare_keywords_are_not_answers():
+    coverage = score_principles("Test something and/or whatever. The output is wrong. Verify it.")
+    
+    assert coverage.missing == PRINCIPLES
+
+def test_negated_answers_do_not_count():
+    request = ("Improve the pipeline\n\n[Refinement 1]: I don't know which files. "
+               "No report needed. Not sure what success looks like.")
+    
+    assert score_principles(request).missing == PRINCIPLES
+
+def test_negative_constraints_naming_a_path_count_as_scope():
+    coverage = score_principles("Harden the login flow\n\n[Refinement 1]: Don't touch anything outside src/auth/.")
+    
+    assert coverage.covered['scope']
+    assert coverage.evidence['scope'] == ['src/auth/']
+    assert coverage.missing == ['objective', 'deliverable', 'success']
+    
+    coverage = score_principles("Harden the login flow. No changes to tests/fixtures/ please. Do not produce src/auth/report.md")
+    assert coverage.missing == ['objective', 'deliverable', 'success']
+
+def test_answer_shaped_phrases_count():
+    coverage = score_principles("Fix the crash in src/parser.py. Output: a modified parser.py. Success: all tests pass.")
+    
+    assert coverage.is_complete
+    assert "output: a modified parser.py" in coverage.evidence['deliverable']
+
+def test_refined_request_covers_every_principle():
+    request = """make the parser compliant with robot.txt
+
+[Refinement 1]: Focus on data_processor.py file. Need to optimize memory usage and add error handling.
+
+[Refinement 2]: Output should be modified data_processor.py with optimizations. Success = 50% faster processing time and no memory leaks."""
+    
+    coverage = score_principles(request)
+    
+    assert coverage.is_complete
+    assert coverage.score == 1.0
+
+def test_focus_questions_keeps_only_missing_principles():
+    assert focus_questions(QUESTIONS, ['scope', 'success']) == "**SCOPE:** Which files?\n**SUCCESS:** How is it validated?"
+
+def test_focus_questions_leaves_unstructured_questions_alone():
+    assert focus_questions("1. What?\n2. Where?", PRINCIPLES) == "1. What?\n2. Where?"
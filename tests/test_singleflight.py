@@ -0,0 +1,103 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import dspy
+import pytest
+
+from atf.concurrency import bind_settings
+from atf.memo import StageMemo
+from atf.singleflight import SingleFlight
+
+class SlowLM:
+    """Delays every call of the wrapped fake LM so concurrent requests overlap."""
+
+    def __init__(self, lm, delay=0.2):
+        self.lm = lm
+        self.delay = delay
+        self.kwargs = lm.kwargs
+        self.history = lm.history
+
+    def __call__(self, prompt, **kwargs):
+        time.sleep(self.delay)
+        return self.lm(prompt, **kwargs)
+
+def run_concurrently(fn, args, workers=8):
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(bind_settings(fn), args))
+
+def test_concurrent_identical_requests_share_one_computation(instructor, fake_lm):
+    instructor.memo = StageMemo(enabled=False)
+    requests = ["Add a README.md file"] * 4 + ["  Add a README.md   file "] * 4
+    
+    with dspy.settings.context(lm=SlowLM(fake_lm)):
+        results = run_concurrently(instructor.process_request, requests)
+    
+    assert len(fake_lm.history) == 3
+    assert all(r == results[0] for r in results)
+    assert len({id(r) for r in results}) == len(results)
+    stats = instructor.inflight.stats()['by_kind']['request']
+    assert stats == {'executed': 1, 'coalesced': 7}
+
+def test_distinct_requests_are_not_coalesced(instructor, fake_lm):
+    instructor.memo = StageMemo(enabled=False)
+    requests = [f"Add a README.md file to package {i}" for i in range(4)]
+    
+    with dspy.settings.context(lm=SlowLM(fake_lm, delay=0.05)):
+        run_concurrently(instructor.process_request, requests)
+    
+    assert len(fake_lm.history) == 12
+    assert instructor.inflight.stats()['coalesced'] == 0
+
+@pytest.mark.parametrize("memoize", [False, True])
+def test_requests_on_different_lms_are_not_coalesced(instructor, fake_lm, memoize):
+    if memoize:
+        instructor.new_session()
+    other_lm = dspy.utils.DummyLM(dict(fake_lm.answers))
+    slow, other_slow = SlowLM(fake_lm, delay=0.1), SlowLM(other_lm, delay=0.1)
+    
+    def run(lm):
+        with dspy.settings.context(lm=lm):
+            return instructor.process_request("Add a README.md file")
+    run_concurrently(run, [slow, other_slow], workers=2)
+    # Repeated on one LM: served from that LM's memo entries within a session
+    run_concurrently(run, [other_slow], workers=1)
+    
+    assert len(fake_lm.history) == 3
+    assert len(other_lm.history) == 3 if memoize else 6
+    assert instructor.inflight.stats()['coalesced'] == 0
+
+def test_stage_level_coalescing(instructor, fake_lm):
+    instructor.memo = StageMemo(enabled=False)
+    
+    with dspy.settings.context(lm=SlowLM(fake_lm)):
+        run_concurrently(instructor.instruct, ["Add a README.md file"] * 6, workers=6)
+    
+    assert len(fake_lm.history) == 1
+    assert instructor.inflight.stats()['by_kind']['instruction_generator'] == {'executed': 1, 'coalesced': 5}
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+    started = threading.Event()
+    
+    def fail():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("model unavailable")
+    
+    def call(_):
+        try:
+            flight.do("key", fail)
+        except RuntimeError as e:
+            return str(e)
+    
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        first = pool.submit(call, None)
+        started.wait()
+        others = [pool.submit(call, None) for _ in range(3)]
+        errors = [first.result()] + [f.result() for f in others]
+    
+    assert errors == ["model unavailable"] * 4
+    assert flight.stats()['executed'] == 1
+    assert flight.stats()['coalesced'] == 3
+    assert not flight.is_in_flight("key")
@@ -0,0 +1,71 @@
+import io
+import json
+
+import pytest
+
+from atf.sinks import ConsoleSink, JsonlSink, MarkdownDirSink, MultiSink, QuietSink, sink_from_spec
+
+REQUEST = "Add a README.md file"
+
+def test_process_request_prints_nothing_by_default(instructor, capsys):
+    instructor.process_request(REQUEST)
+    
+    # DummyLM echoes its prompts; the instructor itself must not print
+    output = capsys.readouterr().out
+    assert "Processing your request" not in output
+    assert "OPTION" not in output
+
+def test_buffered_console_writes_each_request_once(instructor):
+    stream = io.StringIO()
+    writes = []
+    stream.write = lambda text, _write=stream.write: writes.append(text) or _write(text)
+    sink = ConsoleSink(buffered=True, stream=stream)
+    
+    instructor.process_request(REQUEST, sink=sink)
+    sink.flush()
+    
+    assert len(writes) == 1
+    assert "🔍 Analyzing request specificity..." in writes[0]
+    assert "🚀 OPTION 2: READY-TO-USE INSTRUCTION" in writes[0]
+
+def test_jsonl_and_markdown_sinks(instructor, tmp_path):
+    jsonl = JsonlSink(str(tmp_path / "results.jsonl"))
+    markdown = MarkdownDirSink(str(tmp_path / "tasks"))
+    sink = MultiSink([jsonl, markdown])
+    
+    instructor.process_request(REQUEST, sink=sink)
+    instructor.process_request(REQUEST, sink=sink)
+    sink.flush()
+    
+    records = [json.loads(line) for line in (tmp_path / "results.jsonl").read_text().splitlines()]
+    assert [r['user_request'] for r in records] == [REQUEST, REQUEST]
+    assert records[0]['final_instruction'] == "Add a README.md file describing the project."
+    
+    files = sorted((tmp_path / "tasks").glob("*.md"))
+    assert len(files) == 2
+    assert "## Ready-to-Use Instruction" in files[0].read_text()
+
+def test_export_never_overwrites_by_default(instructor, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    
+    first = instructor.export("", "one", "agent_task")
+    second = instructor.export("", "two", "agent_task")
+    
+    assert first != second
+    assert (tmp_path / first).read_text() == "one"
+    assert (tmp_path / second).read_text() == "two"
+
+def test_save_reports_the_outcome_inline(instructor, tmp_path, capsys):
+    path = tmp_path / "task.txt"
+    assert instructor.save(str(path), "text", "agent_task") == str(path)
+    assert path.read_text() == "text"
+    assert f"Saved to {path}" in capsys.readouterr().out
+    
+    assert instructor.save(str(tmp_path / "missing" / "task.txt"), "text", "agent_task") is None
+    assert "Error saving file" in capsys.readouterr().out
+
+def test_sink_from_spec(tmp_path):
+    assert isinstance(sink_from_spec("quiet"), QuietSink)
+    assert isinstance(sink_from_spec(f"buffered,jsonl:{tmp_path / 'out.jsonl'}"), MultiSink)
+    with pytest.raises(ValueError):
+        sink_from_spec("carrier-pigeon")